@@ -0,0 +1,307 @@
+"""
+Latency and throughput benchmark for the product API.
+
+Seeds a throwaway Postgres database, created next to the one configured in
+``.env`` and migrated to head, with synthetic products through
+``upsert_products``. Then drives
+``src.main:app`` with concurrent clients, in-process over the ASGI transport
+and over HTTP against a uvicorn subprocess.
+
+Usage:
+    python -m benchmarks.api_bench --products 20000 --concurrency 32 --requests 2000
+    python -m benchmarks.api_bench --transport asgi --json report.json
+    python -m benchmarks.api_bench --json new.json --compare old.json
+
+Each scenario reports p50/p95/p99 and mean latency, requests/sec, non-2xx
+responses and, in-process only, SQL statements per request. The JSON report
+holds the git revision and configuration so runs can be compared.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from urllib.parse import urlencode
+
+import httpx
+from dotenv import load_dotenv
+
+from benchmarks.common import (
+    create_database,
+    drop_database,
+    git_revision,
+    migrate_database,
+    peak_rss_mb,
+)
+
+BRANDS = ["Nike", "adidas", "Levi's", "New Balance", "Vans", "Converse", "UGG"]
+SORTS = ["discount", "price_asc", "price_desc", "newest"]
+SEARCH_WORDS = ["nike", "adid", "relaxed", "fit", "new", "vans", "product"]
+
+
+def synthetic_products(count: int, seed: int) -> list:
+    from src.schemas.product import SProduct
+
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    products = []
+    for id in range(1, count + 1):
+        previous = round(rng.uniform(20, 200), 2)
+        current = round(previous * rng.uniform(0.3, 1), 2)
+        products.append(
+            SProduct(
+                id=id,
+                name=f"{rng.choice(BRANDS)} relaxed fit product {id}",
+                brand_name=rng.choice(BRANDS),
+                current_price=current,
+                previous_price=previous,
+                discount_percent=round((1 - current / previous) * 100),
+                currency="GBP",
+                url=f"bench/prd/{id}",
+                images=[f"images.asos-media.com/products/bench/{id}-{n}" for n in range(4)],
+                product_code=id,
+                selling_fast=rng.random() < 0.2,
+                updated_at=now - timedelta(minutes=rng.randrange(60 * 24 * 7)),
+            )
+        )
+    return products
+
+
+async def seed(products: list, batch: int = 1000) -> None:
+    from src.database import engine
+    from src.services.product import upsert_products
+
+    for start in range(0, len(products), batch):
+        await upsert_products(products[start : start + batch])
+    await engine.dispose()
+
+
+def scenarios(slugs: List[str], seed: int) -> Dict[str, Callable[[], str]]:
+    rng = random.Random(seed)
+
+    def product_list() -> str:
+        params = {"limit": rng.choice((20, 50, 100)), "sort": rng.choice(SORTS)}
+        if rng.random() < 0.3:
+            params["brand"] = rng.choice(BRANDS)
+        if rng.random() < 0.3:
+            params["min_discount"] = rng.choice((20, 40, 60))
+        return f"/api/products/?{urlencode(params)}"
+
+    def product_detail() -> str:
+        return f"/api/products/{rng.choice(slugs)}"
+
+    def product_search() -> str:
+        q = " ".join(rng.sample(SEARCH_WORDS, rng.choice((1, 2))))
+        return f"/api/products/search?{urlencode({'q': q})}"
+
+    return {"list": product_list, "detail": product_detail, "search": product_search}
+
+
+def summarize(latencies: List[float], elapsed: float, failures: int) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 2)
+
+    return {
+        "requests": len(latencies),
+        "failures": failures,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    next_path: Callable[[], str],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    remaining = itertools.count()
+    latencies: List[float] = []
+    failures = 0
+
+    async def worker() -> None:
+        nonlocal failures
+        while next(remaining) < requests:
+            path = next_path()
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 300:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, failures)
+
+
+async def bench_asgi(args: argparse.Namespace, slugs: List[str]) -> Dict[str, Any]:
+    from sqlalchemy import event
+
+    from src.database import engine
+    from src.main import app
+
+    statements = itertools.count()
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *_: next(statements))
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, next_path in scenarios(slugs, args.seed).items():
+                await drive(client, next_path, args.warmup, args.concurrency)
+                before = next(statements)
+                result = await drive(client, next_path, args.requests, args.concurrency)
+                result["queries_per_request"] = round(
+                    (next(statements) - before - 1) / result["requests"], 2
+                )
+                results[name] = result
+                print(f"asgi    {name:7} {format_result(result)}")
+    await engine.dispose()
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def bench_uvicorn(args: argparse.Namespace, slugs: List[str]) -> Dict[str, Any]:
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "src.main:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(args.uvicorn_workers),
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ]
+    )
+    results = {}
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30
+        ) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise SystemExit(f"uvicorn exited with {server.returncode}")
+                    await asyncio.sleep(0.1)
+            else:
+                raise SystemExit("uvicorn did not start")
+
+            for name, next_path in scenarios(slugs, args.seed).items():
+                await drive(client, next_path, args.warmup, args.concurrency)
+                result = await drive(client, next_path, args.requests, args.concurrency)
+                results[name] = result
+                print(f"uvicorn {name:7} {format_result(result)}")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    text = (
+        "p50 {p50_ms}ms  p95 {p95_ms}ms  p99 {p99_ms}ms  "
+        "{requests_per_second} req/s  {failures} failed"
+    ).format(**result)
+    if "queries_per_request" in result:
+        text += f"  {result['queries_per_request']} queries/req"
+    return text
+
+
+def compare(report: Dict[str, Any], baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    print(f"\nCompared with {baseline_path} ({baseline.get('revision')}):")
+    for transport, scenarios in report["results"].items():
+        for name, result in scenarios.items():
+            before = baseline.get("results", {}).get(transport, {}).get(name)
+            if not before:
+                continue
+            deltas = "  ".join(
+                f"{key} {(result[key] - before[key]) / before[key]:+.1%}"
+                for key in ("p50_ms", "p95_ms", "p99_ms", "requests_per_second")
+                if before.get(key)
+            )
+            print(f"{transport:7} {name:7} {deltas}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000, help="per scenario")
+    parser.add_argument("--warmup", type=int, default=200, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--transport", choices=("asgi", "uvicorn", "both"), default="both"
+    )
+    parser.add_argument("--uvicorn-workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-database", action="store_true")
+    parser.add_argument("--json", type=Path, help="write the report to this file")
+    parser.add_argument("--compare", type=Path, help="a previous JSON report")
+    args = parser.parse_args()
+
+    load_dotenv()
+    database = f"{os.environ['POSTGRES_DB']}_api_bench"
+    os.environ["POSTGRES_DB"] = database
+
+    asyncio.run(create_database(database))
+    try:
+        migrate_database(database)
+        products = synthetic_products(args.products, args.seed)
+        started = time.perf_counter()
+        asyncio.run(seed(products))
+        print(f"Seeded {len(products)} products in {time.perf_counter() - started:.1f}s")
+        slugs = [product.slug for product in products]
+
+        results = {}
+        if args.transport in ("asgi", "both"):
+            results["asgi"] = asyncio.run(bench_asgi(args, slugs))
+        if args.transport in ("uvicorn", "both"):
+            results["uvicorn"] = asyncio.run(bench_uvicorn(args, slugs))
+    finally:
+        if not args.keep_database:
+            asyncio.run(drop_database(database))
+
+    report = {
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "process_peak_rss_mb": round(peak_rss_mb(), 1),
+        "results": results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, default=str, indent=2))
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+import os
+import resource
+import subprocess
+import sys
+from pathlib import Path
+
+import asyncpg
+from sqlalchemy import URL
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+async def _admin_connection() -> asyncpg.Connection:
+    return await asyncpg.connect(
+        user=os.environ["POSTGRES_USER"],
+        password=os.environ.get("POSTGRES_PASSWORD"),
+        host=os.environ["POSTGRES_HOST"],
+        port=os.environ["POSTGRES_PORT"],
+        database="postgres",
+    )
+
+
+async def create_database(name: str) -> None:
+    """
+    (Re)create an empty database next to the one configured in the environment.
+    """
+    connection = await _admin_connection()
+    try:
+        await connection.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        await connection.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await connection.close()
+
+
+async def drop_database(name: str) -> None:
+    connection = await _admin_connection()
+    try:
+        await connection.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    finally:
+        await connection.close()
+
+
+def migrate_database(name: str) -> None:
+    """
+    Bring a database to the latest schema with ``alembic upgrade head``, as a
+    deployment does, so benchmarks run against the migrated indexes.
+    """
+    url = URL.create(
+        "postgresql",
+        username=os.environ["POSTGRES_USER"],
+        password=os.environ.get("POSTGRES_PASSWORD") or None,
+        host=os.environ["POSTGRES_HOST"],
+        port=int(os.environ["POSTGRES_PORT"]),
+        database=name,
+    )
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT,
+        env={**os.environ, "DB_URL": url.render_as_string(hide_password=False)},
+        check=True,
+    )
+
+
+def peak_rss_mb() -> float:
+    """
+    The high-water mark of this process's, or its largest child's, resident
+    memory since it started. It never goes down between runs.
+    """
+    # ru_maxrss is in kilobytes on Linux.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
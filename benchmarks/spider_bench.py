@@ -0,0 +1,278 @@
+"""
+Offline throughput benchmark for the spider.
+
+Starts a local aiohttp stand-in for ASOS's ``search/v2/categories`` endpoint,
+points a generated brand catalogue at it and runs ``gather_data`` against a
+throwaway Postgres database created next to the one configured in ``.env``
+(the upsert, search and cleanup SQL is Postgres specific, so SQLite cannot
+stand in). Pages are synthesized, or replayed from recorded responses with
+``--recordings``, with configurable latency and error rate.
+
+Usage:
+    python -m benchmarks.spider_bench --brands 10 --items 2000 --latency 50
+    python -m benchmarks.spider_bench --runs 2 --error-rate 0.02 --json report.json
+
+Reported per run: end-to-end time, products/sec, pages served, injected
+errors, database round-trips (statements executed by this process; shard
+processes are not counted when ``--workers`` > 1) and the process's peak RSS
+so far, which includes earlier runs and shard processes and never goes down.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from benchmarks.common import (
+    create_database,
+    drop_database,
+    git_revision,
+    migrate_database,
+    peak_rss_mb,
+)
+
+SEARCH_PATH = "/api/product/search/v2/categories/"
+
+
+class AsosStandIn:
+    """
+    Serves ASOS-shaped search pages for ``brands`` categories of ``items``
+    products each, delaying every response by ``latency`` seconds and failing
+    ``error_rate`` of them with a 429 or 503.
+    """
+
+    def __init__(
+        self,
+        items: int,
+        latency: float,
+        error_rate: float,
+        recordings: Optional[Path] = None,
+        seed: int = 0,
+    ):
+        self.items = items
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.pool = load_recordings(recordings) if recordings else []
+        self.pages = 0
+        self.products = 0
+        self.errors = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency * self.random.uniform(0.5, 1.5))
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            status = self.random.choice((429, 503))
+            return web.Response(status=status, headers={"Retry-After": "0"})
+
+        category = int(request.match_info["category"])
+        offset = int(request.query["offset"])
+        limit = int(request.query["limit"])
+        products = [
+            self.product(category * 1_000_000 + position)
+            for position in range(offset, min(offset + limit, self.items))
+        ]
+        self.pages += 1
+        self.products += len(products)
+        return web.json_response({"itemCount": self.items, "products": products})
+
+    def product(self, id: int) -> Dict[str, Any]:
+        if self.pool:
+            product = dict(self.pool[id % len(self.pool)])
+            product.update(id=id, productCode=id)
+            return product
+        previous = round(20 + id % 180, 2)
+        return {
+            "id": id,
+            "name": f"Bench Product {id} Relaxed Fit Cotton Blend",
+            "price": {
+                "current": {"value": round(previous * (0.3 + (id % 7) / 10), 2)},
+                "previous": {"value": previous},
+                "rrp": {"value": None},
+                "isMarkedDown": True,
+                "isOutletPrice": False,
+                "currency": "GBP",
+            },
+            "colour": "Black",
+            "colourWayId": id,
+            "brandName": f"Bench Brand {id // 1_000_000}",
+            "hasVariantColours": False,
+            "hasMultiplePrices": False,
+            "productCode": id,
+            "productType": "Product",
+            "url": f"bench-brand/bench-product/prd/{id}#colourWayId-{id}",
+            "imageUrl": f"images.asos-media.com/products/bench/{id}-1-black",
+            "additionalImageUrls": [
+                f"images.asos-media.com/products/bench/{id}-{n}" for n in range(2, 5)
+            ],
+            "videoUrl": None,
+            "showVideo": False,
+            "isSellingFast": id % 5 == 0,
+            "isRestockingSoon": False,
+            "sponsoredCampaignId": None,
+            "facetGroupings": [],
+            "advertisement": None,
+        }
+
+
+def load_recordings(directory: Path) -> List[Dict[str, Any]]:
+    """
+    Collect the products of recorded search responses (``*.json`` files).
+    """
+    pool = []
+    for path in sorted(directory.glob("*.json")):
+        pool.extend(json.loads(path.read_text()).get("products", []))
+    if not pool:
+        raise SystemExit(f"No recorded products found in {directory}")
+    return pool
+
+
+async def start_stand_in(stand_in: AsosStandIn) -> tuple[web.AppRunner, int]:
+    app = web.Application()
+    app.router.add_get(SEARCH_PATH + "{category:\\d+}", stand_in.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, runner.addresses[0][1]
+
+
+async def bench(args: argparse.Namespace, workdir: Path) -> List[Dict[str, Any]]:
+    stand_in = AsosStandIn(
+        items=args.items,
+        latency=args.latency / 1000,
+        error_rate=args.error_rate,
+        recordings=args.recordings,
+        seed=args.seed,
+    )
+    runner, port = await start_stand_in(stand_in)
+
+    # The spider's modules read their settings at import time.
+    import src.catalogue
+
+    src.catalogue.SEARCH_URL = (
+        f"http://127.0.0.1:{port}{SEARCH_PATH}"
+        "{brand_url}offset={offset}&limit={limit}"
+    )
+    from sqlalchemy import event
+
+    from src.database import engine
+    from src.spider import gather_data
+
+    statements = itertools.count()
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda *_: next(statements),
+    )
+    reports = []
+    try:
+        for run in range(1, args.runs + 1):
+            stand_in.pages = stand_in.products = stand_in.errors = 0
+            shutil.rmtree(workdir / "cache", ignore_errors=True)
+            (workdir / "schedule.json").unlink(missing_ok=True)
+            before = next(statements)
+            started = time.perf_counter()
+            await gather_data(args.workers)
+            elapsed = time.perf_counter() - started
+            reports.append(
+                {
+                    "run": run,
+                    "seconds": round(elapsed, 3),
+                    "products": stand_in.products,
+                    "products_per_second": round(stand_in.products / elapsed, 1),
+                    "pages": stand_in.pages,
+                    "errors_injected": stand_in.errors,
+                    "db_round_trips": next(statements) - before - 1,
+                    "process_peak_rss_mb": round(peak_rss_mb(), 1),
+                }
+            )
+            print(
+                "run {run}: {seconds}s, {products} products "
+                "({products_per_second}/s), {pages} pages, "
+                "{errors_injected} errors, {db_round_trips} round-trips, "
+                "process peak RSS so far {process_peak_rss_mb} MB".format(**reports[-1])
+            )
+    finally:
+        await engine.dispose()
+        await runner.cleanup()
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--brands", type=int, default=10)
+    parser.add_argument("--items", type=int, default=2000, help="products per brand")
+    parser.add_argument("--latency", type=float, default=50, help="milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--recordings", type=Path, help="directory of recorded pages")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=1000, help="requests per second")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-database", action="store_true")
+    parser.add_argument("--json", type=Path, help="write the report to this file")
+    args = parser.parse_args()
+
+    load_dotenv()
+    database = f"{os.environ['POSTGRES_DB']}_spider_bench"
+    workdir = Path(tempfile.mkdtemp(prefix="spider-bench-"))
+    brands = workdir / "brands.json"
+    brands.write_text(
+        json.dumps(
+            {
+                # Nothing reaches the discount threshold, so no Telegram sends.
+                "defaults": {"interval_minutes": 0, "discount_threshold": 101},
+                "brands": [
+                    {"name": f"bench_{n}", "url": f"{n + 1}?"}
+                    for n in range(args.brands)
+                ],
+            }
+        )
+    )
+    os.environ.update(
+        POSTGRES_DB=database,
+        SPIDER_BRANDS_PATH=str(brands),
+        SPIDER_SCHEDULE_PATH=str(workdir / "schedule.json"),
+        SPIDER_CACHE_DIR=str(workdir / "cache"),
+        SPIDER_CHECKPOINT_PATH=str(workdir / "checkpoint.jsonl"),
+        SPIDER_METRICS_PATH=str(workdir / "spider.prom"),
+        SPIDER_CONCURRENCY=str(args.concurrency),
+        SPIDER_REQUESTS_PER_SECOND=str(args.rate),
+        TG_QUEUE_PATH=str(workdir / "telegram-queue.jsonl"),
+        TG_DRAIN_TIMEOUT="1",
+    )
+
+    asyncio.run(create_database(database))
+    try:
+        migrate_database(database)
+        reports = asyncio.run(bench(args, workdir))
+    finally:
+        if not args.keep_database:
+            asyncio.run(drop_database(database))
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {"revision": git_revision(), "config": vars(args), "runs": reports},
+                default=str,
+                indent=2,
+            )
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Request, status
+
+from src.services.auth import AuthBearer, revoke_token
+
+router = APIRouter(prefix="/auth", tags=["Auth Endpoint"])
+
+
+@router.post("/logout", status_code=status.HTTP_200_OK)
+async def logout(request: Request, token: str = Depends(AuthBearer())):
+    """
+    Revokes the bearer token the request was made with.
+
+    Args:
+        request (Request): The incoming request.
+        token (str): The caller's bearer token. Defaults to Depends(AuthBearer()).
+
+    Returns:
+        dict: A dictionary containing the detail message.
+
+    Status Code:
+        - 200: If the token has been revoked.
+
+    """
+    await revoke_token(request.app.state.redis, token)
+    return {"detail": "Successfully logged out"}
@@ -1,16 +1,35 @@
-from typing import Sequence
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.config import settings
 from src.database import get_db
+from src.exceptions import BadRequestHTTPException
 from src.models.product import ProductOrm
-from src.schemas.product import SProduct
-from src.services.product import select_products
+from src.schemas.product import SPriceHistory, SProduct, SProductFilter, SProductPage
+from src.services.auth import AuthBearer
+from src.services.cache import cached_response, invalidate_responses
+from src.services.price_history import select_lowest_prices, select_price_history
+from src.services.product import (
+    parse_sort_key,
+    product_sort_key,
+    search_products,
+    select_products,
+    serialize_product_page,
+)
+from src.utils.cursor import decode_cursor, encode_cursor
+from src.utils.ttl_cache import TTLCache
 
 router = APIRouter(prefix="/products", tags=["Products Endpoint"])
 
-# temp staff_only
-staff_only = "staff_only"
+staff_only = AuthBearer()
+
+# Serialized product responses, keyed by the response cache generation.
+# Absorbs bursts of reads for the same few products after a Telegram post.
+product_cache: TTLCache[bytes] = TTLCache(
+    maxsize=settings.PRODUCT_CACHE_SIZE, ttl=settings.PRODUCT_CACHE_TTL
+)
 
 
 @router.post(
@@ -19,7 +38,9 @@ staff_only = "staff_only"
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(staff_only)],
 )
-async def create_product(payload: SProduct, db_session: AsyncSession = Depends(get_db)):
+async def create_product(
+    payload: SProduct, request: Request, db_session: AsyncSession = Depends(get_db)
+):
     """
     Creates a new product.
 
@@ -35,6 +56,7 @@ async def create_product(payload: SProduct, db_session: AsyncSession = Depends(g
     """
     product = ProductOrm(**payload.model_dump())
     await product.save(db_session)
+    await invalidate_responses(request.app.state.redis)
     return product
 
 
@@ -44,7 +66,9 @@ async def create_product(payload: SProduct, db_session: AsyncSession = Depends(g
     status_code=status.HTTP_200_OK,
     dependencies=[Depends(staff_only)],
 )
-async def update_product(payload: SProduct, db_session: AsyncSession = Depends(get_db)):
+async def update_product(
+    payload: SProduct, request: Request, db_session: AsyncSession = Depends(get_db)
+):
     """
     Updates a product in the database.
 
@@ -60,11 +84,15 @@ async def update_product(payload: SProduct, db_session: AsyncSession = Depends(g
     """
     product = ProductOrm(**payload.model_dump())
     await product.update(db_session, **product.as_dict())
+    product_cache.clear()
+    await invalidate_responses(request.app.state.redis)
     return product
 
 
 @router.delete("/", status_code=status.HTTP_200_OK, dependencies=[Depends(staff_only)])
-async def delete_product(payload: SProduct, db_session: AsyncSession = Depends(get_db)):
+async def delete_product(
+    payload: SProduct, request: Request, db_session: AsyncSession = Depends(get_db)
+):
     """
     Deletes a product from the database.
 
@@ -86,19 +114,85 @@ async def delete_product(payload: SProduct, db_session: AsyncSession = Depends(g
 
     """
 
-    product = await ProductOrm.find(db_session, slug=payload.slug)
+    product = await ProductOrm.find(
+        db_session, slug=payload.slug, include_expired=True
+    )
     await product.delete(db_session)
+    product_cache.clear()
+    await invalidate_responses(request.app.state.redis)
 
     return {
         "detail": f"Product with slug: {payload.slug} has been successfully deleted"
     }
 
 
+@router.get("/cache/stats", status_code=status.HTTP_200_OK)
+async def get_product_cache_stats():
+    """
+    Returns the size and hit/miss counters of the in-process product cache.
+    """
+    return product_cache.stats()
+
+
+@router.get("/search", response_model=SProductPage, status_code=status.HTTP_200_OK)
+async def search_all_products(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Searches products by name and brand, best matches first, with cursor pagination.
+
+    Every word of the query matches as a prefix, so partial words find products while typing.
+
+    Args:
+        q (str): The search text.
+        cursor (str, optional): The ``next_cursor`` of the previous page. Defaults to None for the first page.
+        limit (int): The maximum number of records to return. Defaults to 20.
+
+    Returns:
+        SProductPage: The matching products and the cursor of the next page, if any.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+
+    Status Code:
+        - 200: If the search succeeds, including when nothing matches.
+        - 400: If the cursor is invalid.
+    """
+
+    after = None
+    if cursor:
+        try:
+            rank, id = decode_cursor(cursor, size=2)
+            after = float(rank), int(id)
+        except (TypeError, ValueError) as ex:
+            raise BadRequestHTTPException(f"Invalid cursor: {cursor}") from ex
+
+    async def build() -> bytes:
+        result = await search_products(q, limit=limit + 1, after=after)
+        items = result[:limit]
+        next_cursor = None
+        if len(result) > limit:
+            next_cursor = encode_cursor(items[-1].rank, items[-1].id)
+        return serialize_product_page(items, next_cursor)
+
+    params = {"q": q, "cursor": cursor, "limit": limit}
+    return await cached_response(request, "products:search", params, build)
+
+
 @router.get("/{product_slug}", response_model=SProduct, status_code=status.HTTP_200_OK)
-async def get_product(product_slug: str, db_session: AsyncSession = Depends(get_db)):
+async def get_product(
+    product_slug: str, request: Request, db_session: AsyncSession = Depends(get_db)
+):
     """
     Retrieves a product from the database based on its slug.
 
+    The serialized product is cached in process for PRODUCT_CACHE_TTL seconds
+    and in Redis until the next crawl, with concurrent misses for the same
+    slug sharing a single lookup.
+
     Args:
         product_slug (str): The slug of the product to retrieve.
         db_session (AsyncSession, optional): The database session. Defaults to Depends(get_db).
@@ -113,37 +207,116 @@ async def get_product(product_slug: str, db_session: AsyncSession = Depends(get_
         200: If the product is successfully retrieved.
     """
 
-    product = await ProductOrm.find(db_session, slug=product_slug)
-    return product
+    async def build() -> SProduct:
+        product = await ProductOrm.find(db_session, slug=product_slug)
+        return SProduct.model_validate(product)
+
+    return await cached_response(
+        request, "products:detail", {"slug": product_slug}, build, local=product_cache
+    )
+
+
+@router.get(
+    "/{product_slug}/history",
+    response_model=SPriceHistory,
+    status_code=status.HTTP_200_OK,
+)
+async def get_product_price_history(
+    product_slug: str,
+    request: Request,
+    since: Optional[datetime] = None,
+    db_session: AsyncSession = Depends(get_db),
+):
+    """
+    Retrieves the recorded price changes of a product.
 
+    Args:
+        product_slug (str): The slug of the product.
+        since (datetime, optional): Only return prices observed from this time on. Defaults to None for the full history.
+        db_session (AsyncSession, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        SPriceHistory: The price changes, oldest first, and the lowest price ever recorded.
 
-@router.get("/", response_model=Sequence[SProduct], status_code=status.HTTP_200_OK)
+    Raises:
+        HTTPException: If no product is found with the given slug.
+
+    Status Code:
+        200: If the history is successfully retrieved.
+    """
+
+    async def build() -> SPriceHistory:
+        product = await ProductOrm.find(db_session, slug=product_slug)
+        points = await select_price_history(product.id, since=since)
+        lowest = await select_lowest_prices([product.id])
+        current_price = float(product.current_price)
+        return SPriceHistory(
+            product_id=product.id,
+            currency=product.currency,
+            current_price=current_price,
+            lowest_price=lowest.get(product.id, current_price),
+            points=points,
+        )
+
+    params = {"slug": product_slug, "since": since.isoformat() if since else None}
+    return await cached_response(request, "products:history", params, build)
+
+
+@router.get("/", response_model=SProductPage, status_code=status.HTTP_200_OK)
 async def get_all_products(
-    offset: int = 0,
-    limit: int = 20,
+    request: Request,
+    filters: SProductFilter = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
 ):
     """
-    Retrieves all products from the database with pagination.
+    Retrieves filtered products from the database with cursor pagination.
+
+    Pages are cached in Redis, keyed by the normalized query parameters, until the next crawl.
+    Products are selected as plain rows and encoded straight to JSON, without building a model per item.
 
     Args:
-        offset (int): The number of records to skip. Defaults to 0.
+        filters (SProductFilter): Brand, price range, minimum discount and selling_fast filters, and the sort order.
+        cursor (str, optional): The ``next_cursor`` of the previous page. Defaults to None for the first page.
         limit (int): The maximum number of records to return. Defaults to 20.
 
     Returns:
-        Sequence[SProduct]: A sequence of SProduct objects representing the retrieved products.
+        SProductPage: The retrieved products and the cursor of the next page, if any.
 
     Raises:
-        HTTPException: If no products are found in the database.
+        HTTPException: If the cursor is invalid or no products are found in the database.
 
     Status Code:
         - 200: If the products are successfully retrieved.
+        - 400: If the cursor is invalid or belongs to another sort order.
         - 404: If no products are found in the database.
     """
 
-    result = await select_products(offset=offset, limit=limit)
-
-    if not result:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Products do not exist"
-        )
-    return result
+    after = None
+    if cursor:
+        try:
+            sort, *keyset = decode_cursor(cursor, size=3)
+            if sort != filters.sort.value:
+                raise ValueError(f"Cursor does not match sort order {filters.sort.value}")
+            after = parse_sort_key(filters.sort, *keyset)
+        except ValueError as ex:
+            raise BadRequestHTTPException(str(ex)) from ex
+
+    async def build() -> bytes:
+        result = await select_products(limit=limit + 1, after=after, filters=filters)
+
+        if not result:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=f"Products do not exist"
+            )
+
+        items = result[:limit]
+        next_cursor = None
+        if len(result) > limit:
+            next_cursor = encode_cursor(
+                filters.sort.value, *product_sort_key(items[-1], filters.sort)
+            )
+        return serialize_product_page(items, next_cursor)
+
+    params = {**filters.model_dump(mode="json"), "cursor": cursor, "limit": limit}
+    return await cached_response(request, "products:list", params, build)
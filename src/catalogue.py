@@ -0,0 +1,149 @@
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+PAGE_SIZE = 199
+
+SEARCH_URL = "https://www.asos.com/api/product/search/v2/categories/{brand_url}offset={offset}&limit={limit}&range=sale&store=ROE&lang=en-GB&currency=GBP&rowlength=4&channel=desktop-web&country=TR&keyStoreDataversion=h7g0xmn-38"
+
+
+@dataclass(frozen=True)
+class Brand:
+    """
+    A brand/category listing to crawl, with its search URL precompiled.
+
+    ``interval`` is the number of seconds to wait between crawls of the brand,
+    ``priority`` orders its pages ahead of lower priority brands and only deals
+    of at least ``discount_threshold`` percent are announced.
+    """
+
+    name: str
+    url: str
+    interval: float
+    priority: int = 0
+    discount_threshold: int = 20
+    url_prefix: str = field(init=False, repr=False, compare=False)
+    url_suffix: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        prefix, suffix = SEARCH_URL.split("{offset}")
+        object.__setattr__(self, "url_prefix", prefix.format(brand_url=self.url))
+        object.__setattr__(self, "url_suffix", suffix.format(limit=PAGE_SIZE))
+
+    def page_url(self, offset: int) -> str:
+        return f"{self.url_prefix}{offset}{self.url_suffix}"
+
+
+def load_brands(path: Path) -> List[Brand]:
+    """
+    Read the brand catalogue file.
+
+    The file holds a ``brands`` list of objects with a ``name`` and a category
+    ``url`` fragment; ``interval_minutes``, ``priority`` and
+    ``discount_threshold`` fall back to the file's ``defaults``.
+
+    Raises:
+        ValueError: If the file is not valid JSON, an entry is incomplete or a
+            name is used twice.
+    """
+    try:
+        document = json.loads(path.read_text())
+        defaults = document.get("defaults", {})
+        brands = []
+        for entry in document["brands"]:
+            options = {**defaults, **entry}
+            brands.append(
+                Brand(
+                    name=options["name"],
+                    url=options["url"],
+                    interval=float(options["interval_minutes"]) * 60,
+                    priority=int(options.get("priority", 0)),
+                    discount_threshold=int(options.get("discount_threshold", 20)),
+                )
+            )
+    except (KeyError, TypeError, AttributeError) as ex:
+        raise ValueError(f"Invalid brand catalogue {path}: {ex!r}") from ex
+
+    names = [brand.name for brand in brands]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Invalid brand catalogue {path}: duplicate brand names")
+    return brands
+
+
+class BrandCatalogue:
+    """
+    The brands to crawl, reloaded from ``path`` whenever the file changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.brands: List[Brand] = []
+        self._mtime: Optional[int] = None
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Load the file again if it changed since the last load.
+
+        Returns:
+            bool: Whether the brands were reloaded.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is invalid; the previous brands are kept.
+        """
+        mtime = self.path.stat().st_mtime_ns
+        if mtime == self._mtime:
+            return False
+        self.brands = load_brands(self.path)
+        self._mtime = mtime
+        return True
+
+
+class CrawlSchedule:
+    """
+    When each brand was last crawled in full, kept on disk so a restarted
+    spider still honours the brands' intervals.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.last_crawled: Dict[str, float] = {}
+        try:
+            self.last_crawled = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            pass
+
+    def due(self, brands: Iterable[Brand], now: Optional[float] = None) -> List[Brand]:
+        """
+        Return the brands whose interval has elapsed, highest priority first.
+        """
+        now = time.time() if now is None else now
+        due = [
+            brand
+            for brand in brands
+            if now - self.last_crawled.get(brand.name, 0) >= brand.interval
+        ]
+        return sorted(due, key=lambda brand: -brand.priority)
+
+    def next_due_in(self, brands: Iterable[Brand], now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return min(
+            (
+                max(0.0, self.last_crawled.get(brand.name, 0) + brand.interval - now)
+                for brand in brands
+            ),
+            default=float("inf"),
+        )
+
+    def mark_crawled(self, brands: Iterable[Brand], at: Optional[float] = None):
+        at = time.time() if at is None else at
+        for brand in brands:
+            self.last_crawled[brand.name] = at
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_suffix(".part")
+        partial.write_text(json.dumps(self.last_crawled))
+        os.replace(partial, self.path)
@@ -0,0 +1,78 @@
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+
+class CrawlCheckpoint:
+    """
+    Append-only record of the (brand, offset) pages a crawl has finished.
+
+    Every finished page is written as one JSON line as soon as it is stored, so
+    an interrupted crawl can resume where it stopped. The first page of a brand
+    also records the brand's ``itemCount`` so the remaining offsets are known
+    without probing again, and every page records the product ids it listed so
+    stale product cleanup still sees them after a resume. A checkpoint older than ``max_age`` seconds is
+    considered stale and ignored.
+    """
+
+    def __init__(self, path: str, max_age: float):
+        self.path = Path(path)
+        self.done: Set[Tuple[str, int]] = set()
+        self.item_counts: Dict[str, int] = {}
+        self.seen_ids: Dict[str, Set[int]] = {}
+
+        if self.path.exists() and time.time() - self.path.stat().st_mtime > max_age:
+            self.path.unlink()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open() as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line may be cut short by the interruption.
+                    continue
+                self._apply(entry)
+
+    def _apply(self, entry: Dict) -> None:
+        self.done.add((entry["brand"], entry["offset"]))
+        if entry.get("item_count") is not None:
+            self.item_counts[entry["brand"]] = entry["item_count"]
+        self.seen_ids.setdefault(entry["brand"], set()).update(entry.get("ids", ()))
+
+    def __len__(self) -> int:
+        return len(self.done)
+
+    def is_done(self, brand: str, offset: int) -> bool:
+        return (brand, offset) in self.done
+
+    def mark_done(
+        self,
+        brand: str,
+        offset: int,
+        item_count: Optional[int] = None,
+        ids: Iterable[int] = (),
+    ):
+        entry = {
+            "brand": brand,
+            "offset": offset,
+            "item_count": item_count,
+            "ids": list(ids),
+        }
+        with self.path.open("a") as file:
+            file.write(json.dumps(entry) + "\n")
+        self._apply(entry)
+
+    def clear(self) -> None:
+        """
+        Forget all progress once a crawl has completed.
+        """
+        self.path.unlink(missing_ok=True)
+        self.done.clear()
+        self.item_counts.clear()
+        self.seen_ids.clear()
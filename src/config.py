@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 
 from pydantic import PostgresDsn, RedisDsn, computed_field
 from pydantic_core import MultiHostUrl
@@ -13,10 +14,17 @@ class Settings(BaseSettings):
     REDIS_HOST: str
     REDIS_PORT: int
     REDIS_DB: str
+    CACHE_TTL: int = 60 * 60
+    PRODUCT_CACHE_SIZE: int = 1024
+    PRODUCT_CACHE_TTL: float = 30.0
+    GZIP_MINIMUM_SIZE: int = 1024
 
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM")
     JWT_EXPIRE: int = os.getenv("JWT_EXPIRE")
     SECRET_KEY: str = os.getenv("SECRET_KEY")
+    AUTH_CACHE_SIZE: int = 4096
+    AUTH_CACHE_TTL: float = 30.0
+    AUTH_REVOCATION_CHANNEL: str = "auth:revoked"
 
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
@@ -24,6 +32,51 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int
     POSTGRES_DB: str
 
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 30 * 60
+    DB_STATEMENT_TIMEOUT: int = 30_000
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_POOL_WARN_SATURATION: float = 0.8
+
+    SPIDER_WORKERS: int = 1
+    SPIDER_BRANDS_PATH: str = "src/brands.json"
+    SPIDER_SCHEDULE_PATH: str = ".cache/brand-schedule.json"
+    SPIDER_CATALOGUE_POLL_INTERVAL: float = 60.0
+    SPIDER_CONCURRENCY: int = 8
+    SPIDER_REQUESTS_PER_SECOND: float = 4.0
+    SPIDER_MAX_RETRIES: int = 5
+    SPIDER_CONNECTION_LIMIT: int = 32
+    SPIDER_CONNECTION_LIMIT_PER_HOST: int = 8
+    SPIDER_DNS_CACHE_TTL: int = 300
+    SPIDER_KEEPALIVE_TIMEOUT: float = 30.0
+    SPIDER_REQUEST_TIMEOUT: float = 60.0
+    SPIDER_CACHE_DIR: str = ".cache/spider"
+    SPIDER_CACHE_TTL: int = 900
+    SPIDER_RETRY_ROUNDS: int = 1
+    SPIDER_CHECKPOINT_PATH: str = ".cache/crawl-checkpoint.jsonl"
+    SPIDER_CHECKPOINT_MAX_AGE: int = 12 * 60 * 60
+    SPIDER_METRICS_PATH: str = ".cache/spider.prom"
+    SPIDER_PROFILE: bool = False
+
+    CLEANUP_CHUNK_SIZE: int = 1000
+    TOMBSTONE_RETENTION_DAYS: int = 28
+
+    TG_QUEUE_PATH: str = ".cache/telegram-queue.jsonl"
+    TG_ALBUM_SIZE: int = 5
+    TG_SEND_INTERVAL: float = 3.0
+    TG_DRAIN_TIMEOUT: float = 600.0
+
+    PROFILE_MODE: str = "sample"
+    PROFILE_DIR: str = ".cache/profiles"
+    PROFILE_INTERVAL: float = 0.005
+    PROFILE_REQUEST_SAMPLE_RATE: float = 0.0
+    PROFILE_REQUEST_HEADER: str = "X-Profile"
+    PROFILE_REQUEST_TOKEN: Optional[str] = None
+
     @computed_field
     @property
     def redis_url(self) -> RedisDsn:
@@ -1,19 +1,67 @@
+import time
 from collections.abc import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import create_async_engine
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
 from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.config import settings as global_settings
 from src.utils.logging import AppLogger
+from src.utils.metrics import DB_POOL_WAIT_SECONDS, DB_QUERY_SECONDS
 
 logger = AppLogger().get_logger()
 
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default async pool, recording how long each checkout waits for a
+    connection (including opening a new one) in ``DB_POOL_WAIT_SECONDS``.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
 engine = create_async_engine(
     global_settings.asyncpg_url.unicode_string(),
     future=True,
-    echo=True,
+    poolclass=TimedQueuePool,
+    echo=global_settings.DB_ECHO,
+    pool_size=global_settings.DB_POOL_SIZE,
+    max_overflow=global_settings.DB_MAX_OVERFLOW,
+    pool_timeout=global_settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=global_settings.DB_POOL_PRE_PING,
+    pool_recycle=global_settings.DB_POOL_RECYCLE,
+    connect_args={
+        # Set to 0 when running behind pgbouncer in transaction mode.
+        "prepared_statement_cache_size": global_settings.DB_STATEMENT_CACHE_SIZE,
+        "server_settings": {
+            "statement_timeout": str(global_settings.DB_STATEMENT_TIMEOUT),
+        },
+    },
 )
 
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _observe_query(conn, cursor, statement, parameters, context, executemany):
+    DB_QUERY_SECONDS.observe(
+        time.perf_counter() - context.query_started,
+        operation=statement.lstrip().split(None, 1)[0].upper(),
+    )
+
+
 AsyncSessionFactory = async_sessionmaker(
     engine,
     autoflush=False,
@@ -21,7 +69,77 @@ AsyncSessionFactory = async_sessionmaker(
 )
 
 
+class UnitOfWork:
+    """
+    Long-lived unit of work for batch jobs such as the spider.
+
+    Leases one pooled connection on first use and keeps it until closed, so a
+    worker pays for checkout and session setup once instead of per statement.
+    Statements issued through ``session()`` share one transaction until
+    ``commit`` is called, e.g. at each page boundary. ``rollback`` also
+    releases the connection, so a broken one is replaced on next use.
+
+    Usage:
+        async with UnitOfWork() as uow:
+            await upsert_products(page, session=await uow.session())
+            await uow.commit()
+    """
+
+    def __init__(self):
+        self._connection: Optional[AsyncConnection] = None
+        self._session: Optional[AsyncSession] = None
+
+    async def session(self) -> AsyncSession:
+        if self._session is None:
+            self._connection = await engine.connect()
+            self._session = AsyncSession(
+                bind=self._connection, autoflush=False, expire_on_commit=False
+            )
+        return self._session
+
+    async def commit(self) -> None:
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        session, connection = self._session, self._connection
+        self._session = self._connection = None
+        if session is not None:
+            await session.close()
+        if connection is not None:
+            await connection.close()
+
+    async def __aenter__(self) -> "UnitOfWork":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+def pool_status() -> dict:
+    """
+    Report how busy the connection pool is.
+
+    ``saturation`` is the share of the pool's total capacity (pool size plus
+    overflow) that is checked out; at 1.0 new requests wait for a connection.
+    """
+    pool = engine.pool
+    capacity = pool.size() + global_settings.DB_MAX_OVERFLOW
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(pool.checkedout() / capacity, 2) if capacity else 0.0,
+    }
+
+
 async def get_db() -> AsyncGenerator:
     async with AsyncSessionFactory() as session:
-        # logger.debug(f"ASYNC Pool: {engine.pool.status()}")
+        status = pool_status()
+        if status["saturation"] >= global_settings.DB_POOL_WARN_SATURATION:
+            logger.warning(f"ASYNC Pool saturated: {status}")
         yield session
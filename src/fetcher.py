@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+import aiohttp
+
+from src.config import settings
+from src.utils.metrics import ASOS_REQUEST_SECONDS, ASOS_RESPONSES
+
+headers = {
+    "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Mobile Safari/537.36",
+    "Cookie": "browseCountry=TR; browseCurrency=GBP;",
+}
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RetryableResponse(Exception):
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"ASOS responded with {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass
+class CachedPage:
+    body: Path
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        with self.body.open("rb") as file:
+            while chunk := file.read(CHUNK_SIZE):
+                yield chunk
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw search page bodies keyed by brand and offset.
+
+    Each entry is a body file plus a small JSON file holding the URL it was
+    fetched from, the validators (ETag / Last-Modified) and the time it was
+    last confirmed fresh. An entry is only served for the same URL, so editing
+    a brand's query in the catalogue does not serve the old query's pages.
+    """
+
+    def __init__(self, directory: str, ttl: float):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.directory / f"{key}.json", self.directory / f"{key}.meta.json"
+
+    def get(self, key: str, url: str) -> Optional[CachedPage]:
+        body, meta = self._paths(key)
+        try:
+            validators = json.loads(meta.read_text())
+        except (OSError, ValueError):
+            return None
+        if validators.pop("url", None) != url or not body.exists():
+            return None
+        return CachedPage(body=body, url=url, **validators)
+
+    def touch(self, key: str, page: CachedPage) -> None:
+        page.fetched_at = time.time()
+        self._write_meta(
+            key, page.url, page.etag, page.last_modified, page.fetched_at
+        )
+
+    async def tee(
+        self, key: str, url: str, response: aiohttp.ClientResponse
+    ) -> AsyncIterator[bytes]:
+        """
+        Pass the response body through while writing it to the cache.
+
+        The entry is only replaced once the whole body has been received.
+        """
+        body, _ = self._paths(key)
+        partial = body.with_suffix(".part")
+        try:
+            with partial.open("wb") as file:
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    file.write(chunk)
+                    yield chunk
+            os.replace(partial, body)
+            self._write_meta(
+                key,
+                url,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                time.time(),
+            )
+        finally:
+            partial.unlink(missing_ok=True)
+
+    def _write_meta(
+        self,
+        key: str,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        fetched_at: float,
+    ) -> None:
+        _, meta = self._paths(key)
+        meta.write_text(
+            json.dumps(
+                {
+                    "url": url,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "fetched_at": fetched_at,
+                }
+            )
+        )
+
+
+def create_session() -> aiohttp.ClientSession:
+    """
+    Create the spider's HTTP session with a tuned, keep-alive connection pool.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=settings.SPIDER_CONNECTION_LIMIT,
+        limit_per_host=settings.SPIDER_CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=settings.SPIDER_DNS_CACHE_TTL,
+        keepalive_timeout=settings.SPIDER_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=headers,
+        timeout=aiohttp.ClientTimeout(total=settings.SPIDER_REQUEST_TIMEOUT),
+    )
+
+
+class Fetcher:
+    """
+    Fetch search pages, serving them from the response cache when possible.
+
+    Fresh cache entries are read from disk without a request; stale ones are
+    revalidated with ``If-None-Match`` / ``If-Modified-Since`` and reused on a
+    304. Anything else is streamed from the network and cached on the way.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.session = session
+        self.cache = cache
+
+    def is_fresh(self, key: str, url: str) -> bool:
+        cached = self.cache.get(key, url) if self.cache else None
+        return bool(cached and cached.is_fresh(self.cache.ttl))
+
+    @asynccontextmanager
+    async def fetch(self, key: str, url: str) -> AsyncIterator[AsyncIterator[bytes]]:
+        cached = self.cache.get(key, url) if self.cache else None
+        if cached and cached.is_fresh(self.cache.ttl):
+            yield cached.iter_chunks()
+            return
+
+        conditional: Dict[str, str] = {}
+        if cached and cached.etag:
+            conditional["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            conditional["If-Modified-Since"] = cached.last_modified
+
+        started = time.perf_counter()
+        try:
+            response = await self.session.get(url=url, headers=conditional)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            ASOS_RESPONSES.inc(status="error")
+            raise
+        ASOS_REQUEST_SECONDS.observe(time.perf_counter() - started)
+        ASOS_RESPONSES.inc(status=response.status)
+
+        async with response:
+            if response.status == 304 and cached:
+                self.cache.touch(key, cached)
+                yield cached.iter_chunks()
+                return
+            if response.status in RETRYABLE_STATUSES:
+                retry_after = response.headers.get("Retry-After")
+                raise RetryableResponse(
+                    response.status,
+                    float(retry_after)
+                    if retry_after and retry_after.isdigit()
+                    else None,
+                )
+            response.raise_for_status()
+            if self.cache:
+                yield self.cache.tee(key, url, response)
+            else:
+                yield response.content.iter_any()
@@ -1,10 +1,36 @@
+import asyncio
 import os
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 from src.api.router import api_router
+from src.config import settings
+from src.database import pool_status
+from src.services.auth import listen_for_revocations
+from src.services.cache import create_redis
+from src.utils.metrics import (
+    CONTENT_TYPE,
+    DB_POOL_CONNECTIONS,
+    MetricsMiddleware,
+    registry,
+)
+from src.utils.profiling import ProfilingMiddleware
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.redis = create_redis()
+    revocations = asyncio.create_task(listen_for_revocations(app.state.redis))
+    yield
+    revocations.cancel()
+    await asyncio.gather(revocations, return_exceptions=True)
+    await app.state.redis.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,9 +40,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
+
+app.add_middleware(MetricsMiddleware)
+
+if settings.PROFILE_REQUEST_SAMPLE_RATE > 0 or settings.PROFILE_REQUEST_TOKEN:
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=settings.PROFILE_DIR,
+        mode=settings.PROFILE_MODE,
+        sample_rate=settings.PROFILE_REQUEST_SAMPLE_RATE,
+        header=settings.PROFILE_REQUEST_HEADER,
+        token=settings.PROFILE_REQUEST_TOKEN,
+        interval=settings.PROFILE_INTERVAL,
+    )
+
 app.include_router(api_router)
 
 
 @app.get("/")
 async def root():
     return {"ASOS SHOP API": "v1"}
+
+
+@app.get("/health/pool")
+async def database_pool():
+    return pool_status()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    for state, count in pool_status().items():
+        if state in ("checked_in", "checked_out", "overflow"):
+            DB_POOL_CONNECTIONS.set(count, state=state)
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,35 @@
+"""products slug
+
+Revision ID: 5b8c0d6a9e13
+Revises: 06238cfc2d83
+Create Date: 2026-10-18 11:20:37.664102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8c0d6a9e13'
+down_revision = '06238cfc2d83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ProductOrm.slug was added to the model without a migration; databases
+    # where it was created by hand already have it.
+    op.execute('ALTER TABLE products ADD COLUMN IF NOT EXISTS slug VARCHAR')
+    op.execute(
+        "UPDATE products SET slug = trim(both '-' from "
+        "regexp_replace(lower(name), '[^a-z0-9]+', '-', 'g')) || '-' || id "
+        "WHERE slug IS NULL"
+    )
+    op.alter_column('products', 'slug', existing_type=sa.VARCHAR(), nullable=False)
+    op.execute('CREATE UNIQUE INDEX IF NOT EXISTS products_slug_key ON products (slug)')
+
+
+def downgrade() -> None:
+    # The column and its unique index belong to the ProductOrm model from the
+    # start, and upgrade cannot tell whether it created them, so they are kept.
+    pass
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import TIMESTAMP, ForeignKey, Index, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.models.base import Base
+
+
+class PriceHistoryOrm(Base):
+    """
+    Append-only log of product prices, one row per observed price change.
+
+    Prices are stored as integer pence to keep rows narrow, and ``observed_at``
+    grows with insertion order, so a BRIN index covers time-range scans for a
+    fraction of the size of a B-tree.
+    """
+
+    __tablename__ = "price_history"
+    __table_args__ = (
+        Index(
+            "ix_price_history_observed_at",
+            "observed_at",
+            postgresql_using="brin",
+        ),
+    )
+
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    observed_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), primary_key=True
+    )
+    price_pence: Mapped[int] = mapped_column(Integer)
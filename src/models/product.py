@@ -2,7 +2,18 @@ from datetime import datetime
 import decimal
 from typing import Optional
 from fastapi import HTTPException, status
-from sqlalchemy import ARRAY, TIMESTAMP, Numeric, String, select
+from sqlalchemy import (
+    ARRAY,
+    TIMESTAMP,
+    BigInteger,
+    Computed,
+    Index,
+    Numeric,
+    String,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -12,6 +23,29 @@ from src.models.base import Base
 # Database Models
 class ProductOrm(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_discount_percent_id", "discount_percent", "id"),
+        Index(
+            "ix_products_brand_name_discount_percent_id",
+            "brand_name",
+            "discount_percent",
+            "id",
+        ),
+        Index("ix_products_current_price_id", "current_price", "id"),
+        Index("ix_products_updated_at_id", "updated_at", "id"),
+        Index(
+            "ix_products_selling_fast_discount_percent_id",
+            "discount_percent",
+            "id",
+            postgresql_where=text("selling_fast"),
+        ),
+        Index(
+            "ix_products_expired_at",
+            "expired_at",
+            postgresql_where=text("expired_at IS NOT NULL"),
+        ),
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(index=True)
@@ -30,18 +64,32 @@ class ProductOrm(Base):
     product_code: Mapped[int]
     selling_fast: Mapped[bool]
     updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+    fingerprint: Mapped[Optional[int]] = mapped_column(BigInteger)
+    expired_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', name), 'A') || "
+            "setweight(to_tsvector('simple', brand_name), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     def as_dict(self):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
 
     @classmethod
-    async def find(cls, db_session: AsyncSession, slug: str):
+    async def find(
+        cls, db_session: AsyncSession, slug: str, include_expired: bool = False
+    ):
         """
         Find a product in the database by its slug.
 
         Args:
             db_session (AsyncSession): The database session to use for the query.
             slug (str): The slug of the product to find.
+            include_expired (bool): Also find products expired by the last crawl. Defaults to False.
 
         Returns:
             ProductOrm: The found product object.
@@ -50,6 +98,8 @@ class ProductOrm(Base):
             HTTPException: If no product is found with the given slug.
         """
         stmt = select(cls).where(cls.slug == slug)
+        if not include_expired:
+            stmt = stmt.where(cls.expired_at.is_(None))
         result = await db_session.execute(stmt)
         product = result.scalars().first()
         if product is None:
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from src.config import settings
+from src.schemas.product import SProduct
+from src.telegram import send_products_tg
+from src.utils.logging import AppLogger
+from src.utils.metrics import TELEGRAM_SEND_SECONDS
+
+logger = AppLogger().get_logger()
+
+# Rewrite the journal down to the pending deals once it grows past this size,
+# should the queue never run empty long enough to be truncated.
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+
+class NotificationQueue:
+    """
+    Disk-backed queue of deals to announce on Telegram.
+
+    The spider only calls ``put``, which appends the product to a journal file
+    and returns immediately. A dispatcher task drains the queue, groups up to
+    ``album_size`` deals into one ``send_media_group`` album, keeps at least
+    ``interval`` seconds between sends to the chat and waits out flood-wait
+    errors. Deals are acknowledged in the journal only once sent, so anything
+    still pending when the process stops is sent by the next run. The journal
+    is truncated whenever nothing is pending and compacted when it grows past
+    ``JOURNAL_COMPACT_BYTES``, so a long-running spider does not grow it.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.TG_QUEUE_PATH,
+        album_size: int = settings.TG_ALBUM_SIZE,
+        interval: float = settings.TG_SEND_INTERVAL,
+        linger: float = 1.0,
+    ):
+        self.path = Path(path)
+        self.album_size = album_size
+        self.interval = interval
+        self.linger = linger
+        self._queue: asyncio.Queue[Tuple[int, SProduct]] = asyncio.Queue()
+        self._seq = 0
+        # Journal entries put but not yet acknowledged by sequence number,
+        # including albums the dispatcher has taken off the queue and is still
+        # sending.
+        self._unacked: Dict[int, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._restore()
+
+    def _restore(self) -> None:
+        pending = {}
+        if self.path.exists():
+            with self.path.open() as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if "ack" in entry:
+                        pending.pop(entry["ack"], None)
+                    else:
+                        pending[entry["seq"]] = entry["product"]
+
+        # Compact the journal down to what is still pending.
+        self.path.write_text("")
+        for product in pending.values():
+            self.put(SProduct.model_validate(product))
+        if pending:
+            logger.info(f"Restored {len(pending)} pending Telegram notifications")
+
+    def _compact(self) -> None:
+        partial = self.path.with_suffix(".part")
+        with partial.open("w") as file:
+            file.writelines(
+                json.dumps(entry) + "\n" for entry in self._unacked.values()
+            )
+        os.replace(partial, self.path)
+
+    def _append(self, entries: List[dict]) -> None:
+        with self.path.open("a") as file:
+            file.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+    def put(self, product: SProduct) -> None:
+        self._seq += 1
+        entry = {"seq": self._seq, "product": product.model_dump(mode="json")}
+        self._append([entry])
+        self._unacked[self._seq] = entry
+        self._queue.put_nowait((self._seq, product))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._dispatch())
+
+    async def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait up to ``timeout`` seconds for pending deals to be sent, then stop
+        the dispatcher. Unsent deals stay in the journal.
+        """
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"{len(self._unacked)} Telegram notifications left for the next run"
+            )
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        # An album being sent when the dispatcher was cancelled has left the
+        # queue but is not acknowledged; keep the journal for the next run.
+        if not self._unacked:
+            self.path.write_text("")
+
+    async def _next_album(self) -> List[Tuple[int, SProduct]]:
+        album = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.linger
+        while len(album) < self.album_size:
+            try:
+                album.append(
+                    await asyncio.wait_for(
+                        self._queue.get(), max(0, deadline - loop.time())
+                    )
+                )
+            except asyncio.TimeoutError:
+                break
+        return album
+
+    async def _dispatch(self) -> None:
+        while True:
+            album = await self._next_album()
+            await self._send(album)
+            for seq, _ in album:
+                del self._unacked[seq]
+            if not self._unacked:
+                self.path.write_text("")
+            elif self.path.stat().st_size > JOURNAL_COMPACT_BYTES:
+                self._compact()
+            else:
+                self._append([{"ack": seq} for seq, _ in album])
+            for _ in album:
+                self._queue.task_done()
+            await asyncio.sleep(self.interval)
+
+    async def _send(self, album: List[Tuple[int, SProduct]]) -> None:
+        products = [product for _, product in album]
+        delay = self.interval
+        while True:
+            started = time.perf_counter()
+            try:
+                await send_products_tg(products)
+                TELEGRAM_SEND_SECONDS.observe(
+                    time.perf_counter() - started, outcome="sent"
+                )
+                return
+            except TelegramRetryAfter as err:
+                TELEGRAM_SEND_SECONDS.observe(
+                    time.perf_counter() - started, outcome="flood_wait"
+                )
+                logger.warning(f"Telegram flood wait, retrying in {err.retry_after}s")
+                await asyncio.sleep(err.retry_after)
+            except TelegramBadRequest as err:
+                TELEGRAM_SEND_SECONDS.observe(
+                    time.perf_counter() - started, outcome="bad_request"
+                )
+                # Retrying will not help, e.g. an image Telegram cannot fetch.
+                logger.error(f"Dropping {len(products)} notifications: {err!r}")
+                return
+            except Exception as err:
+                TELEGRAM_SEND_SECONDS.observe(
+                    time.perf_counter() - started, outcome="error"
+                )
+                logger.error(f"Telegram send failed, retrying in {delay}s: {err!r}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 300)
@@ -1,9 +1,11 @@
+import re
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from enum import Enum
+from typing import Any, Optional
+from pydantic import BaseModel, Field, model_validator
 
 
-class ProductSchema(BaseModel):
+class SProduct(BaseModel):
     id: int
     name: str
     slug: str
@@ -20,3 +22,49 @@ class ProductSchema(BaseModel):
 
     class Config:
         from_attributes = True
+
+    @model_validator(mode="before")
+    @classmethod
+    def derive_slug(cls, data: Any) -> Any:
+        """
+        Derive a slug from the product name and id when none is given,
+        e.g. products parsed by the spider.
+        """
+        if isinstance(data, dict) and not data.get("slug") and data.get("name"):
+            name = re.sub(r"[^a-z0-9]+", "-", data["name"].lower()).strip("-")
+            data = {**data, "slug": f"{name}-{data.get('id')}"}
+        return data
+
+
+class SProductPage(BaseModel):
+    items: list[SProduct]
+    next_cursor: Optional[str] = None
+
+
+class SPricePoint(BaseModel):
+    observed_at: datetime
+    price: float
+
+
+class SPriceHistory(BaseModel):
+    product_id: int
+    currency: str
+    current_price: float
+    lowest_price: float
+    points: list[SPricePoint]
+
+
+class ProductSort(str, Enum):
+    discount = "discount"
+    price_asc = "price_asc"
+    price_desc = "price_desc"
+    newest = "newest"
+
+
+class SProductFilter(BaseModel):
+    brand: Optional[str] = None
+    min_price: Optional[float] = Field(None, ge=0)
+    max_price: Optional[float] = Field(None, ge=0)
+    min_discount: Optional[int] = Field(None, ge=0, le=100)
+    selling_fast: Optional[bool] = None
+    sort: ProductSort = ProductSort.discount
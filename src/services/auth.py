@@ -1,10 +1,29 @@
+import asyncio
 from time import time
-from jose import jwt
+from jose import JWTError, jwt
 from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
 from src.config import settings
 from src.models.user import User
+from src.utils.logging import AppLogger
+from src.utils.ttl_cache import TTLCache
+
+logger = AppLogger().get_logger()
+
+# Expiry of tokens recently confirmed against Redis, so repeat requests with
+# the same token skip the round-trip. Revocations evict entries through
+# ``listen_for_revocations``; should one be missed, it lasts at most the TTL.
+confirmed_tokens: TTLCache[float] = TTLCache(
+    maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL
+)
+
+# Revocations received so far. A revocation arriving while a token is being
+# confirmed evicts nothing, as the token is only cached once confirmed, so
+# ``AuthBearer`` drops what it cached if this changed during the load.
+revocations_seen = 0
 
 
 async def get_from_redis(request: Request, key: str):
@@ -20,6 +39,102 @@ async def verify_jwt(request: Request, token: str) -> bool:
     return bool(payload)
 
 
+def decode_token(token: str) -> float:
+    """
+    Check a token's signature and expiry without any I/O.
+
+    Args:
+        token (str): The bearer token.
+
+    Returns:
+        float: The token's ``expiry`` as a Unix timestamp.
+
+    Raises:
+        HTTPException: If the signature is invalid or the token has expired.
+    """
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
+        )
+        expiry = float(payload["expiry"])
+    except (JWTError, KeyError, TypeError, ValueError) as ex:
+        raise HTTPException(
+            status_code=403, detail="Invalid token or expired token."
+        ) from ex
+    if expiry <= time():
+        raise HTTPException(status_code=403, detail="Invalid token or expired token.")
+    return expiry
+
+
+async def confirm_token(request: Request, token: str) -> float:
+    """
+    Validate a token locally, then check with Redis that it was not revoked.
+
+    Returns:
+        float: The token's expiry.
+
+    Raises:
+        HTTPException: 403 if the token is invalid, expired or revoked; 503 if
+            Redis cannot be reached to tell.
+    """
+    expiry = decode_token(token)
+    try:
+        issued = await verify_jwt(request, token)
+    except RedisError as ex:
+        logger.error(f"Could not verify a token: {ex!r}")
+        raise HTTPException(
+            status_code=503, detail="Authentication is temporarily unavailable."
+        ) from ex
+    if not issued:
+        raise HTTPException(status_code=403, detail="Invalid token or expired token.")
+    return expiry
+
+
+async def revoke_token(redis: Redis, token: str) -> None:
+    """
+    Revoke a token and tell every API process to drop it from its cache.
+
+    Args:
+        redis (Redis): The Redis client holding issued tokens.
+        token (str): The bearer token to revoke.
+    """
+    confirmed_tokens.pop(token)
+    await redis.delete(token)
+    await redis.publish(settings.AUTH_REVOCATION_CHANNEL, token)
+
+
+async def listen_for_revocations(
+    redis: Redis, cache: TTLCache[float] = confirmed_tokens
+) -> None:
+    """
+    Evict tokens from ``cache`` as ``revoke_token`` announces them.
+
+    Runs until cancelled. The cache is cleared whenever the subscription is
+    (re)established, since announcements made while it was down are lost.
+    """
+    global revocations_seen
+    delay = 1.0
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(settings.AUTH_REVOCATION_CHANNEL)
+                revocations_seen += 1
+                cache.clear()
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        revocations_seen += 1
+                        cache.pop(message["data"].decode())
+        except RedisError as ex:
+            revocations_seen += 1
+            cache.clear()
+            logger.warning(
+                f"Token revocation feed lost, retrying in {delay:.0f}s: {ex!r}"
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+
 class AuthBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
         super().__init__(auto_error=auto_error)
@@ -32,17 +147,27 @@ class AuthBearer(HTTPBearer):
             raise HTTPException(
                 status_code=403, detail="Invalid authentication scheme."
             )
-        if not await verify_jwt(request, credentials.credentials):
+        token = credentials.credentials
+        seen = revocations_seen
+        expiry = await confirmed_tokens.get_or_load(
+            token, lambda: confirm_token(request, token)
+        )
+        if revocations_seen != seen:
+            # Confirmed before a revocation that could not evict it; let the
+            # next request check Redis again.
+            confirmed_tokens.pop(token)
+        if expiry <= time():
+            confirmed_tokens.pop(token)
             raise HTTPException(
                 status_code=403, detail="Invalid token or expired token."
             )
-        return credentials.credentials
+        return token
 
 
 async def create_access_token(user: User, request: Request):
     payload = {
         "email": user.email,
-        "expiry": time.time() + settings.JWT_EXPIRE,
+        "expiry": time() + settings.JWT_EXPIRE,
         "platform": request.headers.get("User-Agent"),
     }
     token = jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
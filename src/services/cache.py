@@ -0,0 +1,150 @@
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.config import settings
+from src.utils.logging import AppLogger
+from src.utils.ttl_cache import TTLCache
+
+logger = AppLogger().get_logger()
+
+GENERATION_KEY = "products:generation"
+
+
+def create_redis() -> Redis:
+    return Redis.from_url(settings.redis_url.unicode_string())
+
+
+async def get_generation(redis: Redis) -> int:
+    return int(await redis.get(GENERATION_KEY) or 0)
+
+
+async def bump_generation(redis: Redis) -> int:
+    """
+    Invalidate every cached product response at once.
+
+    Cached responses are keyed by the current generation, so bumping it makes
+    all existing entries unreachable; they then expire through their TTL.
+    """
+    return await redis.incr(GENERATION_KEY)
+
+
+async def invalidate_responses(redis: Redis) -> None:
+    """
+    Bump the generation after a write through the API, logging Redis failures.
+    """
+    try:
+        await bump_generation(redis)
+    except RedisError as ex:
+        logger.warning(f"Could not invalidate the response cache: {ex!r}")
+
+
+def cache_key(namespace: str, generation: int, params: dict[str, Any]) -> str:
+    """
+    Build a cache key from normalized query parameters.
+
+    Parameters that are None are dropped and the rest are sorted, so equivalent
+    queries share one entry regardless of parameter order.
+    """
+    normalized = json.dumps(
+        {name: value for name, value in params.items() if value is not None},
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.sha1(normalized.encode()).hexdigest()
+    return f"cache:{namespace}:{generation}:{digest}"
+
+
+def cache_etag(key: str) -> str:
+    """
+    Derive an ETag from a cache key. The key changes with the generation, so
+    the ETag does too.
+
+    The tag is weak because GZipMiddleware sends the same response gzip encoded
+    or not, and a strong validator must differ between encodings.
+    """
+    return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    opaque = etag.removeprefix("W/")
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return opaque in candidates
+
+
+async def cached_response(
+    request: Request,
+    namespace: str,
+    params: dict[str, Any],
+    build: Callable[[], Awaitable[BaseModel | bytes]],
+    local: Optional[TTLCache[bytes]] = None,
+) -> Response:
+    """
+    Serve a JSON response from Redis, building and storing it on a miss.
+
+    ``build`` returns either a model or an already encoded JSON body.
+
+    With a ``local`` cache, bodies are also kept in process under the same
+    generation-scoped key and looked up before Redis, with concurrent misses
+    sharing one Redis read or build. A crawl bumps the generation, so local
+    entries from before it are never served or written back to Redis.
+
+    Responses carry an ETag derived from the cache key, so a request whose
+    ``If-None-Match`` still matches the current generation gets a 304 without
+    reading the cache or the database. Redis failures are logged and the
+    response is built from the database without an ETag, so the cache never
+    takes the API down with it.
+    """
+    redis: Redis = request.app.state.redis
+    key: Optional[str] = None
+    try:
+        key = cache_key(namespace, await get_generation(redis), params)
+    except RedisError as ex:
+        logger.warning(f"Response cache unavailable: {ex!r}")
+
+    headers = {}
+    if key is not None:
+        headers["ETag"] = cache_etag(key)
+        if etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    async def load() -> bytes:
+        body: Optional[bytes] = None
+        if key is not None:
+            try:
+                body = await redis.get(key)
+            except RedisError as ex:
+                logger.warning(f"Response cache unavailable: {ex!r}")
+        if body is None:
+            built = await build()
+            body = (
+                built.model_dump_json().encode()
+                if isinstance(built, BaseModel)
+                else built
+            )
+            if key is not None:
+                try:
+                    await redis.set(key, body, ex=settings.CACHE_TTL)
+                except RedisError as ex:
+                    logger.warning(f"Response cache unavailable: {ex!r}")
+        return body
+
+    if local is None:
+        body = await load()
+    else:
+        # Without Redis there is no generation; entries then live for the
+        # local TTL only.
+        local_key = key or cache_key(namespace, -1, params)
+        body = await local.get_or_load(local_key, load)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,83 @@
+from hashlib import blake2b
+from typing import Iterable
+
+from sqlalchemy import select
+
+from src.database import AsyncSessionFactory
+from src.models.product import ProductOrm
+from src.schemas.product import SProduct
+
+
+def product_fingerprint(product: SProduct) -> int:
+    """
+    Compute a compact fingerprint of the fields that change between crawls.
+
+    The price, discount, currency, selling_fast flag and image URLs are hashed
+    into a signed 64-bit integer so it fits a BIGINT column.
+
+    Args:
+        product (SProduct): The parsed product.
+
+    Returns:
+        int: The fingerprint of the product.
+    """
+    content = "\x1f".join(
+        (
+            f"{product.current_price:.2f}",
+            "" if product.previous_price is None else f"{product.previous_price:.2f}",
+            str(product.discount_percent),
+            product.currency,
+            str(product.selling_fast),
+            *product.images,
+        )
+    )
+    digest = blake2b(content.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class FingerprintIndex:
+    """
+    In-process map of product id to the fingerprint stored in Postgres.
+
+    The spider warms it once per crawl and uses it to drop unchanged products
+    before any SQL is issued.
+    """
+
+    def __init__(self, fingerprints: dict[int, int] | None = None):
+        self._fingerprints = fingerprints or {}
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    @classmethod
+    async def warm(cls) -> "FingerprintIndex":
+        """
+        Load the fingerprints of all live products. Expired products are left
+        out so they are written, and revived, when a crawl sees them again.
+
+        Returns:
+            FingerprintIndex: The warmed index.
+        """
+        async with AsyncSessionFactory() as session:
+            stmt = select(ProductOrm.id, ProductOrm.fingerprint).where(
+                ProductOrm.fingerprint.is_not(None), ProductOrm.expired_at.is_(None)
+            )
+            result = await session.execute(stmt)
+            return cls(dict(result.tuples().all()))
+
+    def changed(self, products: Iterable[SProduct]) -> list[SProduct]:
+        """
+        Return the products that are new or whose fingerprint differs.
+        """
+        return [
+            product
+            for product in products
+            if self._fingerprints.get(product.id) != product_fingerprint(product)
+        ]
+
+    def update(self, products: Iterable[SProduct]) -> None:
+        """
+        Record the fingerprints of products that were written to the database.
+        """
+        for product in products:
+            self._fingerprints[product.id] = product_fingerprint(product)
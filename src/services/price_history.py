@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, select
+
+from src.database import AsyncSessionFactory
+from src.models.price_history import PriceHistoryOrm
+from src.schemas.product import SPricePoint
+
+
+async def select_price_history(
+    product_id: int, since: Optional[datetime] = None
+) -> list[SPricePoint]:
+    """
+    Select the recorded prices of a product, oldest first.
+
+    Rows are only written when the price changes, so each point holds until
+    the next one.
+
+    Args:
+        product_id (int): The id of the product.
+        since (datetime, optional): Only return prices observed from this time on.
+
+    Returns:
+        list[SPricePoint]: The price changes of the product.
+    """
+    stmt = select(PriceHistoryOrm.observed_at, PriceHistoryOrm.price_pence).where(
+        PriceHistoryOrm.product_id == product_id
+    )
+    if since is not None:
+        stmt = stmt.where(PriceHistoryOrm.observed_at >= since)
+    stmt = stmt.order_by(PriceHistoryOrm.observed_at)
+
+    async with AsyncSessionFactory() as session:
+        result = await session.execute(stmt)
+        return [
+            SPricePoint(observed_at=observed_at, price=price_pence / 100)
+            for observed_at, price_pence in result.tuples()
+        ]
+
+
+async def select_lowest_prices(product_ids: list[int]) -> dict[int, float]:
+    """
+    Select the lowest price ever recorded for each of the given products.
+
+    Args:
+        product_ids (list[int]): The ids of the products.
+
+    Returns:
+        dict[int, float]: The lowest price by product id, for products with history.
+    """
+    if not product_ids:
+        return {}
+    stmt = (
+        select(PriceHistoryOrm.product_id, func.min(PriceHistoryOrm.price_pence))
+        .where(PriceHistoryOrm.product_id.in_(product_ids))
+        .group_by(PriceHistoryOrm.product_id)
+    )
+    async with AsyncSessionFactory() as session:
+        result = await session.execute(stmt)
+        return {
+            product_id: price_pence / 100
+            for product_id, price_pence in result.tuples()
+        }
@@ -1,45 +1,160 @@
+import decimal
+import re
+from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import select, update, delete, insert
+from typing import Any, Iterable, Optional, Sequence
 
-from src.schemas.product import SProduct
+from pydantic_core import to_json
+from sqlalchemy import (
+    Float,
+    Integer,
+    Row,
+    cast,
+    delete,
+    exists,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.sql import column as sql_column, table as sql_table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.schemas.product import ProductSort, SProduct, SProductFilter
+from src.models.price_history import PriceHistoryOrm
 from src.models.product import ProductOrm
-from src.database import async_session_factory
+from src.config import settings
+from src.database import AsyncSessionFactory, UnitOfWork
+from src.services.fingerprint import product_fingerprint
 
 
-async def insert_product(product: SProduct) -> ProductOrm:
-    async with async_session_factory() as session:
-        try:
-            stmt = (
-                insert(ProductOrm)
-                .values(**product.model_dump(exclude_unset=True, exclude_none=True))
-                .returning(ProductOrm)
-            )
-            result = await session.execute(stmt)
-            await session.commit()
-            return result.scalar()
-        except Exception as err:
-            await session.rollback()
-            raise err
+@dataclass
+class UpsertResult:
+    """
+    Outcome of a batched upsert: the products that were newly inserted and the
+    existing products whose current price changed.
+    """
 
+    inserted: list[SProduct] = field(default_factory=list)
+    price_changed: list[SProduct] = field(default_factory=list)
 
-async def update_product(product: SProduct) -> ProductOrm:
-    async with async_session_factory() as session:
-        try:
-            stmt = (
-                update(ProductOrm)
-                .values(**product.model_dump(exclude_unset=True, exclude_none=True))
-                .returning(ProductOrm)
+    @property
+    def changed(self) -> list[SProduct]:
+        return self.inserted + self.price_changed
+
+
+async def upsert_products(
+    products: Sequence[SProduct], session: Optional[AsyncSession] = None
+) -> UpsertResult:
+    """
+    Insert or update a page of products with a single statement.
+
+    Runs one ``INSERT ... ON CONFLICT (id) DO UPDATE ... RETURNING`` wrapped in a
+    CTE that also reads the previous prices, so a single round-trip covers the
+    whole page. Existing rows are only rewritten when their fingerprint
+    differs or they were expired; untouched rows are not reported. New products
+    and price changes are appended to ``price_history`` by the same statement.
+
+    Args:
+        products (Sequence[SProduct]): The parsed products of one search page.
+        session (AsyncSession, optional): A session whose transaction the caller
+            commits, e.g. a ``UnitOfWork`` session. Defaults to a new session
+            committed right away.
+
+    Returns:
+        UpsertResult: The inserted products and the products with a changed price.
+    """
+    by_id = {product.id: product for product in products}
+    if not by_id:
+        return UpsertResult()
+
+    old = (
+        select(ProductOrm.id, ProductOrm.current_price)
+        .where(ProductOrm.id.in_(by_id))
+        .cte("old")
+    )
+    stmt = pg_insert(ProductOrm).values(
+        [
+            {
+                **product.model_dump(),
+                "fingerprint": product_fingerprint(product),
+                "expired_at": None,
+            }
+            for product in by_id.values()
+        ]
+    )
+    upserted = (
+        stmt.on_conflict_do_update(
+            index_elements=[ProductOrm.id],
+            set_={
+                column: stmt.excluded[column]
+                for column in (*SProduct.model_fields, "fingerprint", "expired_at")
+                if column != "id"
+            },
+            where=or_(
+                ProductOrm.fingerprint.is_distinct_from(stmt.excluded.fingerprint),
+                ProductOrm.expired_at.is_not(None),
+            ),
+        )
+        .returning(
+            ProductOrm.id,
+            ProductOrm.current_price,
+            literal_column("xmax = 0").label("inserted"),
+        )
+        .cte("upserted")
+    )
+    history = (
+        insert(PriceHistoryOrm)
+        .from_select(
+            ["product_id", "observed_at", "price_pence"],
+            select(
+                upserted.c.id,
+                func.now(),
+                cast(func.round(upserted.c.current_price * 100), Integer),
             )
-            result = await session.execute(stmt)
-            await session.commit()
-            return result.scalar()
-        except Exception as err:
-            await session.rollback()
-            raise err
+            .outerjoin(old, old.c.id == upserted.c.id)
+            .where(old.c.current_price.is_distinct_from(upserted.c.current_price)),
+        )
+        .cte("history")
+    )
+    query = (
+        select(
+            upserted.c.id,
+            upserted.c.current_price,
+            upserted.c.inserted,
+            old.c.current_price.label("old_price"),
+        )
+        .outerjoin(old, old.c.id == upserted.c.id)
+        .add_cte(history)
+    )
+
+    if session is not None:
+        rows = (await session.execute(query)).all()
+    else:
+        async with AsyncSessionFactory() as session:
+            try:
+                rows = (await session.execute(query)).all()
+                await session.commit()
+            except Exception as err:
+                await session.rollback()
+                raise err
+
+    result = UpsertResult()
+    for row in rows:
+        if row.inserted:
+            result.inserted.append(by_id[row.id])
+        elif row.current_price != row.old_price:
+            result.price_changed.append(by_id[row.id])
+    return result
 
 
 async def select_one(id: int) -> ProductOrm:
-    async with async_session_factory() as session:
+    async with AsyncSessionFactory() as session:
         try:
             stmt = select(ProductOrm).where(ProductOrm.id == id)
             result = await session.scalar(stmt)
@@ -49,19 +164,183 @@ async def select_one(id: int) -> ProductOrm:
             raise err
 
 
-async def select_products(offset: int, limit: int) -> list[ProductOrm]:
-    async with async_session_factory() as session:
+# The columns of ``SProduct`` for list endpoints, selected as plain rows
+# instead of ORM objects. Prices are read as floats, the type the API serves.
+PRODUCT_FIELDS = tuple(SProduct.model_fields)
+PRODUCT_COLUMNS = tuple(
+    ProductOrm.__table__.c[name].cast(Float).label(name)
+    if name in ("current_price", "previous_price")
+    else ProductOrm.__table__.c[name]
+    for name in PRODUCT_FIELDS
+)
+
+
+def serialize_product_page(rows: Sequence[Row], next_cursor: Optional[str]) -> bytes:
+    """
+    Encode rows that start with ``PRODUCT_COLUMNS`` as ``SProductPage`` JSON.
+
+    The rows already hold the types of ``SProduct``, so they go straight to
+    pydantic-core's encoder without building and validating a model per row.
+    Extra trailing columns, such as a search rank, are left out.
+    """
+    items = [dict(zip(PRODUCT_FIELDS, row)) for row in rows]
+    return to_json({"items": items, "next_cursor": next_cursor})
+
+
+# Sort column and direction of each listing order; ties are broken by id in
+# the same direction so (column, id) is a unique keyset.
+SORT_KEYS = {
+    ProductSort.discount: (ProductOrm.discount_percent, True),
+    ProductSort.price_asc: (ProductOrm.current_price, False),
+    ProductSort.price_desc: (ProductOrm.current_price, True),
+    ProductSort.newest: (ProductOrm.updated_at, True),
+}
+
+
+def product_sort_key(product: Row | ProductOrm, sort: ProductSort) -> tuple[Any, int]:
+    """
+    Return the JSON-serializable keyset of a product for the given order.
+    """
+    column, _ = SORT_KEYS[sort]
+    value = getattr(product, column.key)
+    if isinstance(value, (decimal.Decimal, datetime)):
+        value = str(value)
+    return value, product.id
+
+
+def parse_sort_key(sort: ProductSort, value: Any, id: Any) -> tuple[Any, int]:
+    """
+    Convert a keyset produced by ``product_sort_key`` back to column values.
+
+    Raises:
+        ValueError: If the values do not fit the columns of the given order.
+    """
+    column, _ = SORT_KEYS[sort]
+    try:
+        if column is ProductOrm.current_price:
+            # Through str() so float prices from list rows stay exact.
+            value = decimal.Decimal(str(value))
+        elif column is ProductOrm.updated_at:
+            value = datetime.fromisoformat(value)
+        else:
+            value = int(value)
+        return value, int(id)
+    except (ArithmeticError, TypeError, ValueError) as ex:
+        raise ValueError(f"Invalid keyset for {sort.value} order") from ex
+
+
+async def select_products(
+    limit: int,
+    after: Optional[tuple[Any, int]] = None,
+    filters: Optional[SProductFilter] = None,
+) -> list[Row]:
+    """
+    Select a filtered page of products in the requested order, as
+    ``PRODUCT_COLUMNS`` rows.
+
+    Pages are addressed by keyset rather than offset: ``after`` is the
+    ``product_sort_key`` of the last product of the previous page, which lets
+    Postgres seek straight into the matching composite index.
+    """
+    filters = filters or SProductFilter()
+    column, descending = SORT_KEYS[filters.sort]
+
+    conditions = [ProductOrm.expired_at.is_(None)]
+    if filters.brand is not None:
+        conditions.append(ProductOrm.brand_name == filters.brand)
+    if filters.min_price is not None:
+        conditions.append(ProductOrm.current_price >= filters.min_price)
+    if filters.max_price is not None:
+        conditions.append(ProductOrm.current_price <= filters.max_price)
+    if filters.min_discount is not None:
+        conditions.append(ProductOrm.discount_percent >= filters.min_discount)
+    if filters.selling_fast is not None:
+        conditions.append(ProductOrm.selling_fast == filters.selling_fast)
+    if after is not None:
+        keyset = tuple_(column, ProductOrm.id)
+        conditions.append(
+            keyset < tuple_(*after) if descending else keyset > tuple_(*after)
+        )
+
+    async with AsyncSessionFactory() as session:
         try:
-            stmt = select(ProductOrm).offset(offset).limit(limit)
-            result = await session.scalars(stmt)
-            return result.unique().all()
+            stmt = (
+                select(*PRODUCT_COLUMNS)
+                .where(*conditions)
+                .order_by(
+                    *(
+                        (column.desc(), ProductOrm.id.desc())
+                        if descending
+                        else (column.asc(), ProductOrm.id.asc())
+                    )
+                )
+                .limit(limit)
+            )
+            result = await session.execute(stmt)
+            return result.all()
         except Exception as err:
             await session.rollback()
             raise err
 
 
+def search_query(q: str) -> Optional[str]:
+    """
+    Turn free text into a ``to_tsquery`` expression matching every word as a
+    prefix, e.g. ``"nike air"`` -> ``"nike:* & air:*"``.
+
+    Returns:
+        Optional[str]: The expression, or None if the text has no words.
+    """
+    words = re.findall(r"\w+", q.lower())
+    return " & ".join(f"{word}:*" for word in words) or None
+
+
+async def search_products(
+    q: str, limit: int, after: Optional[tuple[float, int]] = None
+) -> list[Row]:
+    """
+    Search live products by name and brand, best matches first.
+
+    Matches come from the GIN index on ``search_vector``; they are ranked with
+    ``ts_rank`` and paged by the (rank, id) keyset of the last result of the
+    previous page.
+
+    Args:
+        q (str): The search text.
+        limit (int): The maximum number of results.
+        after (tuple[float, int], optional): The rank and id of the last result
+            of the previous page.
+
+    Returns:
+        list[Row]: The matching products as ``PRODUCT_COLUMNS`` rows followed
+            by their ``rank``.
+    """
+    expression = search_query(q)
+    if expression is None:
+        return []
+
+    query = func.to_tsquery("english", expression)
+    rank = func.ts_rank(ProductOrm.search_vector, query).label("rank")
+    conditions = [
+        ProductOrm.search_vector.bool_op("@@")(query),
+        ProductOrm.expired_at.is_(None),
+    ]
+    if after is not None:
+        conditions.append(tuple_(rank, ProductOrm.id) < tuple_(*after))
+
+    async with AsyncSessionFactory() as session:
+        stmt = (
+            select(*PRODUCT_COLUMNS, rank)
+            .where(*conditions)
+            .order_by(rank.desc(), ProductOrm.id.desc())
+            .limit(limit)
+        )
+        result = await session.execute(stmt)
+        return result.all()
+
+
 async def delete_product(id: int) -> None:
-    async with async_session_factory() as session:
+    async with AsyncSessionFactory() as session:
         try:
             stmt = delete(ProductOrm).where(id=id)
             await session.scalar(stmt)
@@ -72,7 +351,7 @@ async def delete_product(id: int) -> None:
 
 
 async def pagination(offset: int, limit: int) -> list[ProductOrm]:
-    async with async_session_factory() as session:
+    async with AsyncSessionFactory() as session:
         try:
             stmt = select(ProductOrm).offset(offset).limit(limit)
             result = await session.scalars(stmt)
@@ -82,14 +361,111 @@ async def pagination(offset: int, limit: int) -> list[ProductOrm]:
             raise err
 
 
-async def delete_old_products() -> None:
-    four_weeks_ago = datetime.now(timezone.utc) - timedelta(weeks=4)
+# Temporary table holding the ids seen by a crawl; it lives on the unit of
+# work's connection only.
+seen_products = sql_table("seen_products", sql_column("id", Integer))
+
+
+async def expire_unseen_products(
+    seen_ids: Iterable[int], chunk_size: int = settings.CLEANUP_CHUNK_SIZE
+) -> int:
+    """
+    Tombstone every live product that the last crawl did not see.
+
+    The seen ids are loaded into a temporary table and the products missing
+    from it get ``expired_at`` set with an anti-join, ``chunk_size`` rows per
+    transaction so no statement holds row locks for long. Products seen again
+    later are revived by ``upsert_products``.
 
-    async with async_session_factory() as session:
+    Args:
+        seen_ids (Iterable[int]): The ids of every product the crawl parsed.
+        chunk_size (int): The number of rows expired per transaction.
+
+    Returns:
+        int: The number of products expired.
+    """
+    expired = 0
+    async with UnitOfWork() as uow:
+        session = await uow.session()
         try:
-            stmt = delete(ProductOrm).where(ProductOrm.updated_at <= four_weeks_ago)
-            await session.execute(stmt)
-            await session.commit()
-        except Exception as err:
-            await session.rollback()
-            raise err
+            await session.execute(text("DROP TABLE IF EXISTS seen_products"))
+            await session.execute(
+                text("CREATE TEMP TABLE seen_products (id integer PRIMARY KEY)")
+            )
+            await session.execute(
+                text("INSERT INTO seen_products SELECT unnest(CAST(:ids AS integer[]))"),
+                {"ids": list(seen_ids)},
+            )
+            await session.execute(text("ANALYZE seen_products"))
+            await uow.commit()
+
+            stale = (
+                select(ProductOrm.id)
+                .where(
+                    ProductOrm.expired_at.is_(None),
+                    ~exists().where(seen_products.c.id == ProductOrm.id),
+                )
+                .limit(chunk_size)
+                .with_for_update(skip_locked=True)
+            )
+            stmt = (
+                update(ProductOrm)
+                .where(ProductOrm.id.in_(stale.scalar_subquery()))
+                .values(expired_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            while True:
+                result = await session.execute(stmt)
+                await uow.commit()
+                expired += result.rowcount
+                if result.rowcount < chunk_size:
+                    break
+
+            await session.execute(text("DROP TABLE seen_products"))
+            await uow.commit()
+        except Exception:
+            await uow.rollback()
+            raise
+    return expired
+
+
+async def purge_expired_products(
+    retention: timedelta = timedelta(days=settings.TOMBSTONE_RETENTION_DAYS),
+    chunk_size: int = settings.CLEANUP_CHUNK_SIZE,
+) -> int:
+    """
+    Delete products that have stayed expired for longer than ``retention``.
+
+    Rows are deleted ``chunk_size`` at a time, each chunk in its own
+    transaction.
+
+    Returns:
+        int: The number of products deleted.
+    """
+    cutoff = datetime.now(timezone.utc) - retention
+    purgeable = (
+        select(ProductOrm.id)
+        .where(ProductOrm.expired_at < cutoff)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        delete(ProductOrm)
+        .where(ProductOrm.id.in_(purgeable.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+
+    deleted = 0
+    async with UnitOfWork() as uow:
+        session = await uow.session()
+        try:
+            while True:
+                result = await session.execute(stmt)
+                await uow.commit()
+                deleted += result.rowcount
+                if result.rowcount < chunk_size:
+                    break
+        except Exception:
+            await uow.rollback()
+            raise
+    return deleted
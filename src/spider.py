@@ -1,158 +1,635 @@
+import argparse
 import asyncio
+import math
+import multiprocessing
+import os
+import queue
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
 
 import aiohttp
 from dotenv import load_dotenv
+from redis.exceptions import RedisError
 
+from src.catalogue import PAGE_SIZE, Brand, BrandCatalogue, CrawlSchedule
+from src.checkpoint import CrawlCheckpoint
+from src.config import settings
+from src.database import UnitOfWork, engine
+from src.fetcher import Fetcher, ResponseCache, RetryableResponse, create_session
+from src.notifier import NotificationQueue
+from src.services.cache import bump_generation, create_redis
+from src.services.fingerprint import FingerprintIndex
 from src.services.product import (
-    delete_old_products,
-    insert_product,
-    select_one,
-    update_product,
+    expire_unseen_products,
+    purge_expired_products,
+    upsert_products,
 )
 from src.schemas.product import SProduct
-from src.telegram import send_product_tg
+from src.utils.json_stream import JsonArrayStream
+from src.utils.logging import AppLogger
+from src.utils.metrics import (
+    SPIDER_CRAWL_FINISHED,
+    SPIDER_CRAWL_RATE,
+    SPIDER_PAGE_SECONDS,
+    SPIDER_PAGES,
+    SPIDER_PRODUCTS,
+    registry,
+)
+from src.utils.profiling import profile_path, profiled
 
 load_dotenv()
 
-brand_list = [
-    {
-        "name": "newBalance_footwear",
-        "url": "15892?attribute_10992=61388&",
-    },
-    {
-        "name": "levis_jeans_jeans",
-        "url": "7083?attribute_10992=61377&attribute_1047=8393&",
-    },
-    {
-        "name": "levis_sweats",
-        "url": "7083?attribute_10992=61382&",
-    },
-    {
-        "name": "theNorthFace_outerwear",
-        "url": "19899?attribute_10992=61380&",
-    },
-    {
-        "name": "converse_footwear_trainers",
-        "url": "2611?attribute_10992=61388&attribute_1047=8606&",
-    },
-    {
-        "name": "newEra_accessories_cap",
-        "url": "17372?attribute_1047=8275&",
-    },
-    {
-        "name": "hugo",
-        "url": "27909?",
-    },
-    {
-        "name": "birkenstock",
-        "url": "7421?",
-    },
-    {
-        "name": "ugg_footwear_boots",
-        "url": "2609?attribute_10992=61388&attribute_1047=8585&",
-    },
-    {
-        "name": "vans_footwear_trainers",
-        "url": "14751?attribute_10992=61388&attribute_1047=8606&",
-    },
-    {
-        "name": "drMartens",
-        "url": "4650?attribute_10992=61388&",
-    },
-]
-
-headers = {
-    "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Mobile Safari/537.36",
-    "Cookie": "browseCountry=TR; browseCurrency=GBP;",
-}
-
-
-async def get_data(session: aiohttp.ClientSession, brand: Dict, offset: int) -> None:
-    url = f"https://www.asos.com/api/product/search/v2/categories/{brand.get('url')}offset={offset}&limit=199&range=sale&store=ROE&lang=en-GB&currency=GBP&rowlength=4&channel=desktop-web&country=TR&keyStoreDataversion=h7g0xmn-38"
-
-    message_counter = 0
-
-    async with session.get(url=url, headers=headers) as response:
-        data: Dict[str, Any] = await response.json()
-        products: List[Dict] = data.get("products", [])
-        if products:
-            for product in products:
-                current_price = product.get("price").get("current").get("value")
-
-                previous_price = product.get("price").get("previous").get("value")
-                if not previous_price:
-                    previous_price = product.get("price").get("rrp").get("value")
+logger = AppLogger().get_logger()
 
-                try:
-                    discount_percent = round((1 - current_price / previous_price) * 100)
-                except:
-                    discount_percent = 0
-
-                product_data = SProduct(
-                    id=product.get("id"),
-                    name=product.get("name"),
-                    brand_name=product.get("brandName"),
-                    current_price=product.get("price").get("current").get("value"),
-                    previous_price=previous_price,
-                    discount_percent=discount_percent,
-                    currency=product.get("price").get("currency"),
-                    url=product.get("url"),
-                    images=[product.get("imageUrl")]
-                    + product.get("additionalImageUrls"),
-                    product_code=product.get("productCode"),
-                    selling_fast=product.get("isSellingFast"),
-                    updated_at=datetime.now(timezone.utc),
-                )
-
-                existing_product = await select_one(id=product_data.id)
-                if not existing_product:
-                    product_db = await insert_product(product_data)
-                elif (
-                    existing_product
-                    and existing_product.currency != product_data.currency
-                ):
-                    product_db = await update_product(product_data)
-                else:
-                    product_db = None
-
-                if product_db and product_db.discount_percent >= 20:
-                    await send_product_tg(product_db)
-                    message_counter += 1
-
-                    if message_counter % 10 == 0:
-                        sleep_duration = random.uniform(2, 4)
-                        await asyncio.sleep(sleep_duration)
-
-
-async def gather_data():
-    async with aiohttp.ClientSession() as session:
-        for brand in brand_list:
-            url = f"https://www.asos.com/api/product/search/v2/categories/{brand.get('url')}offset=0&limit=199&range=sale&store=ROE&lang=en-GB&currency=GBP&rowlength=4&channel=desktop-web&country=TR&keyStoreDataversion=h7g0xmn-38"
-            response = await session.get(url=url, headers=headers)
-            if response.status == 200:
-                data = await response.json()
-                total_items = data.get("itemCount")
+@dataclass(eq=False)
+class CrawlUnit:
+    brand: Brand
+    offset: int
+    attempts: int = 0
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to a single host.
+
+    The interval between requests widens on 429/5xx responses and decays back
+    to the configured rate as requests succeed again.
+    """
+
+    def __init__(self, rate: float, max_interval: float = 60.0):
+        self.min_interval = 1 / rate
+        self.max_interval = max_interval
+        self.interval = self.min_interval
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def backoff(self, retry_after: Optional[float] = None) -> None:
+        self.interval = min(self.max_interval, self.interval * 2)
+        if retry_after:
+            now = asyncio.get_running_loop().time()
+            self._next_slot = max(self._next_slot, now + retry_after)
+
+    def recover(self) -> None:
+        self.interval = max(self.min_interval, self.interval * 0.9)
+
+
+def parse_product(product: Dict) -> SProduct:
+    current_price = product.get("price").get("current").get("value")
+
+    previous_price = product.get("price").get("previous").get("value")
+    if not previous_price:
+        previous_price = product.get("price").get("rrp").get("value")
+
+    try:
+        discount_percent = round((1 - current_price / previous_price) * 100)
+    except:
+        discount_percent = 0
+
+    return SProduct(
+        id=product.get("id"),
+        name=product.get("name"),
+        brand_name=product.get("brandName"),
+        current_price=current_price,
+        previous_price=previous_price,
+        discount_percent=discount_percent,
+        currency=product.get("price").get("currency"),
+        url=product.get("url"),
+        images=[product.get("imageUrl")] + product.get("additionalImageUrls"),
+        product_code=product.get("productCode"),
+        selling_fast=product.get("isSellingFast"),
+        updated_at=datetime.now(timezone.utc),
+    )
+
+
+@asynccontextmanager
+async def get_data(
+    fetcher: Fetcher, brand: Brand, offset: int
+) -> AsyncIterator[JsonArrayStream]:
+    """
+    Fetch a search page and stream its products as they arrive.
+
+    The yielded stream decodes one product at a time from the response body;
+    ``itemCount`` is available in ``stream.scalars`` once the stream is read.
+    """
+    key = f"{brand.name}-{offset}"
+    async with fetcher.fetch(key, brand.page_url(offset)) as chunks:
+        yield JsonArrayStream(chunks, key="products")
+
+
+async def save_page(
+    page: List[SProduct],
+    fingerprints: FingerprintIndex,
+    notifier: NotificationQueue,
+    uow: UnitOfWork,
+    discount_threshold: int = 20,
+) -> None:
+    page = fingerprints.changed(page)
+    if not page:
+        return
+
+    try:
+        result = await upsert_products(page, session=await uow.session())
+        await uow.commit()
+    except Exception:
+        await uow.rollback()
+        raise
+    fingerprints.update(page)
+
+    for product in result.changed:
+        if product.discount_percent >= discount_threshold:
+            notifier.put(product)
+
+
+class CrawlScheduler:
+    """
+    Crawls every page of every brand through one shared work queue.
+
+    A fixed pool of workers bounds the number of in-flight pages; each worker
+    keeps one database connection and commits once per page. A per-host
+    rate limiter spaces out requests, and 429/5xx responses or network errors
+    are retried with exponential backoff. The first page of a brand doubles as
+    the ``itemCount`` probe and enqueues the remaining offsets once stored.
+
+    Pages of higher priority brands are crawled first. The ids of every listed
+    product are collected per brand in ``seen`` whether or not they changed, so
+    products missing from the crawl can be expired afterwards.
+    Finished pages are recorded in the checkpoint and skipped when an
+    interrupted crawl is resumed. Pages that still fail after their retries are
+    queued again on their own for ``retry_rounds`` more rounds.
+    """
+
+    def __init__(
+        self,
+        fetcher: Fetcher,
+        fingerprints: FingerprintIndex,
+        notifier: NotificationQueue,
+        checkpoint: Optional[CrawlCheckpoint] = None,
+        concurrency: int = settings.SPIDER_CONCURRENCY,
+        rate: float = settings.SPIDER_REQUESTS_PER_SECOND,
+        max_retries: int = settings.SPIDER_MAX_RETRIES,
+        retry_rounds: int = settings.SPIDER_RETRY_ROUNDS,
+    ):
+        self.fetcher = fetcher
+        self.fingerprints = fingerprints
+        self.notifier = notifier
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.rate = rate
+        self.max_retries = max_retries
+        self.retry_rounds = retry_rounds
+        self.failed: List[CrawlUnit] = []
+        self.pages = 0
+        self.products = 0
+        self.seen: Dict[str, Set[int]] = {}
+        self._queue: asyncio.PriorityQueue[Tuple[int, int, CrawlUnit]] = (
+            asyncio.PriorityQueue()
+        )
+        self._seq = 0
+        self._limiters: Dict[str, HostRateLimiter] = {}
+
+    def _limiter(self, url: str) -> HostRateLimiter:
+        host = urlsplit(url).netloc
+        if host not in self._limiters:
+            self._limiters[host] = HostRateLimiter(self.rate)
+        return self._limiters[host]
+
+    def _is_done(self, brand: Brand, offset: int) -> bool:
+        return self.checkpoint is not None and self.checkpoint.is_done(
+            brand.name, offset
+        )
+
+    def _put(self, unit: CrawlUnit) -> None:
+        # The sequence number keeps FIFO order within a priority.
+        self._seq += 1
+        self._queue.put_nowait((-unit.brand.priority, self._seq, unit))
+
+    def _enqueue(self, brand: Brand, offsets: range) -> None:
+        for offset in offsets:
+            if not self._is_done(brand, offset):
+                self._put(CrawlUnit(brand=brand, offset=offset))
+
+    async def run(self, brands: List[Brand]) -> None:
+        if self.checkpoint is not None:
+            # Only for these brands: the checkpoint may still list brands that
+            # another shard crawls now, with ids from an unfinished pass.
+            for brand in brands:
+                if brand.name in self.checkpoint.seen_ids:
+                    self.seen[brand.name] = set(self.checkpoint.seen_ids[brand.name])
+        for brand in brands:
+            if self._is_done(brand, 0):
+                item_count = self.checkpoint.item_counts.get(brand.name, 0)
+                self._enqueue(brand, range(PAGE_SIZE, item_count, PAGE_SIZE))
             else:
-                print(response.status)
-                return
+                self._enqueue(brand, range(0, 1))
+
+        workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        ]
+        try:
+            await self._queue.join()
+            for _ in range(self.retry_rounds):
+                if not self.failed:
+                    break
+                logger.warning(f"Retrying {len(self.failed)} failed pages")
+                for unit in self.failed:
+                    unit.attempts = 0
+                    self._put(unit)
+                self.failed = []
+                await self._queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(self) -> None:
+        async with UnitOfWork() as uow:
+            while True:
+                _, _, unit = await self._queue.get()
+                try:
+                    await self._crawl(unit, uow)
+                except Exception as err:
+                    logger.error(
+                        f"Failed {unit.brand.name} offset={unit.offset}: {err!r}"
+                    )
+                    self.failed.append(unit)
+                finally:
+                    self._queue.task_done()
+
+    async def _crawl(self, unit: CrawlUnit, uow: UnitOfWork) -> None:
+        url = unit.brand.page_url(unit.offset)
+        limiter = self._limiter(url)
+        key = f"{unit.brand.name}-{unit.offset}"
+
+        while True:
+            if not self.fetcher.is_fresh(key, url):
+                await limiter.acquire()
+            started = time.perf_counter()
+            try:
+                async with get_data(self.fetcher, unit.brand, unit.offset) as products:
+                    page = [parse_product(product) async for product in products]
+                SPIDER_PAGE_SECONDS.observe(time.perf_counter() - started, stage="fetch")
+                break
+            except aiohttp.ClientResponseError:
+                raise
+            except (RetryableResponse, aiohttp.ClientError, asyncio.TimeoutError) as err:
+                unit.attempts += 1
+                if unit.attempts > self.max_retries:
+                    raise
+                limiter.backoff(getattr(err, "retry_after", None))
+                await asyncio.sleep(min(30, 2**unit.attempts) * random.uniform(0.5, 1))
+        limiter.recover()
+
+        item_count = None
+        if unit.offset == 0:
+            item_count = products.scalars.get("itemCount") or 0
+
+        with SPIDER_PAGE_SECONDS.time(stage="save"):
+            await save_page(
+                page,
+                self.fingerprints,
+                self.notifier,
+                uow,
+                unit.brand.discount_threshold,
+            )
+        self.pages += 1
+        self.products += len(page)
+        SPIDER_PAGES.inc(brand=unit.brand.name)
+        SPIDER_PRODUCTS.inc(len(page), brand=unit.brand.name)
+        ids = [product.id for product in page]
+        self.seen.setdefault(unit.brand.name, set()).update(ids)
+
+        if self.checkpoint is not None:
+            self.checkpoint.mark_done(unit.brand.name, unit.offset, item_count, ids=ids)
+        # Only once the first page is stored: if it fails, its retry would
+        # otherwise queue the remaining pages a second time.
+        if item_count is not None:
+            self._enqueue(unit.brand, range(PAGE_SIZE, item_count, PAGE_SIZE))
+
+
+@dataclass
+class ShardResult:
+    """
+    What a shard reports back to the parent process once its brands are crawled.
+    """
+
+    shard: int
+    seen: Dict[str, Set[int]] = field(default_factory=dict)
+    pages: int = 0
+    products: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    metrics: Dict = field(default_factory=dict)
+
 
-            tasks = []
-            for offset in range(0, total_items, 199):
-                task = asyncio.create_task(
-                    get_data(session=session, brand=brand, offset=offset)
-                )
-                tasks.append(task)
-            await asyncio.gather(*tasks)
-            sleep_duration = random.uniform(2, 4)
-            await asyncio.sleep(sleep_duration)
+class DealForwarder:
+    """
+    Stands in for the ``NotificationQueue`` inside shard processes and hands
+    deals to the parent, which owns the queue and the Telegram rate limit.
+    """
 
-        session.close()
+    def __init__(self, deals: "queue.Queue[Optional[dict]]"):
+        self.deals = deals
+
+    def put(self, product: SProduct) -> None:
+        self.deals.put(product.model_dump(mode="json"))
+
+
+@contextmanager
+def spider_profile(name: str) -> Iterator[None]:
+    """
+    Profile the block into ``PROFILE_DIR`` when ``SPIDER_PROFILE`` is set.
+    """
+    if not settings.SPIDER_PROFILE:
+        yield
+        return
+    path = profile_path(settings.PROFILE_DIR, name, settings.PROFILE_MODE)
+    with profiled(path, settings.PROFILE_MODE, settings.PROFILE_INTERVAL):
+        yield
+
+
+def shard_checkpoint_path(shard: int, workers: int) -> str:
+    if workers == 1:
+        return settings.SPIDER_CHECKPOINT_PATH
+    return f"{settings.SPIDER_CHECKPOINT_PATH}.{shard + 1}-of-{workers}"
+
+
+async def crawl_shard(
+    shard: int,
+    workers: int,
+    brands: List[Brand],
+    notifier: NotificationQueue | DealForwarder,
+) -> ShardResult:
+    """
+    Crawl a share of the brands with this process's own HTTP session and
+    database pool. The request rate and concurrency are split evenly between
+    the shards so the total stays as configured.
+    """
+    started = time.monotonic()
+    fingerprints = await FingerprintIndex.warm()
+
+    cache = ResponseCache(settings.SPIDER_CACHE_DIR, ttl=settings.SPIDER_CACHE_TTL)
+
+    checkpoint = CrawlCheckpoint(
+        shard_checkpoint_path(shard, workers),
+        max_age=settings.SPIDER_CHECKPOINT_MAX_AGE,
+    )
+    if len(checkpoint):
+        logger.info(f"Resuming shard {shard}, {len(checkpoint)} pages already done")
+
+    async with create_session() as session:
+        fetcher = Fetcher(session=session, cache=cache)
+        scheduler = CrawlScheduler(
+            fetcher=fetcher,
+            fingerprints=fingerprints,
+            notifier=notifier,
+            checkpoint=checkpoint,
+            concurrency=math.ceil(settings.SPIDER_CONCURRENCY / workers),
+            rate=settings.SPIDER_REQUESTS_PER_SECOND / workers,
+        )
+        await scheduler.run(brands)
+
+    return ShardResult(
+        shard=shard,
+        seen=scheduler.seen,
+        pages=scheduler.pages,
+        products=scheduler.products,
+        failed=len(scheduler.failed),
+        elapsed=time.monotonic() - started,
+    )
+
+
+def run_shard(
+    shard: int,
+    workers: int,
+    brands: List[Brand],
+    deals: "queue.Queue[Optional[dict]]",
+) -> ShardResult:
+    """
+    Entry point of a shard process: a fresh event loop around ``crawl_shard``.
+    The shard's metrics are returned with its result for the parent to merge.
+    """
+
+    async def crawl() -> ShardResult:
+        try:
+            return await crawl_shard(shard, workers, brands, DealForwarder(deals))
+        finally:
+            await engine.dispose()
+
+    # The pool may reuse this process for another shard.
+    registry.reset()
+    with spider_profile(f"spider-shard-{shard + 1}-of-{workers}"):
+        result = asyncio.run(crawl())
+    result.metrics = registry.snapshot()
+    return result
+
+
+async def forward_deals(
+    deals: "queue.Queue[Optional[dict]]", notifier: NotificationQueue
+) -> None:
+    loop = asyncio.get_running_loop()
+    while (deal := await loop.run_in_executor(None, deals.get)) is not None:
+        notifier.put(SProduct.model_validate(deal))
+
+
+async def crawl_sharded(
+    brands: List[Brand], workers: int, notifier: NotificationQueue
+) -> List[ShardResult]:
+    """
+    Shard the brands round-robin across ``workers`` processes, each with its
+    own event loop, and collect their results. Deals found by the shards are
+    streamed back to the parent's notification queue as they are stored.
+    """
+    loop = asyncio.get_running_loop()
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager, ProcessPoolExecutor(
+        max_workers=workers, mp_context=context
+    ) as pool:
+        deals = manager.Queue()
+        forwarder = asyncio.create_task(forward_deals(deals, notifier))
+        try:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        pool, run_shard, shard, workers, brands[shard::workers], deals
+                    )
+                    for shard in range(workers)
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            deals.put(None)
+            await forwarder
+
+    return [
+        ShardResult(shard=shard, error=repr(result))
+        if isinstance(result, BaseException)
+        else result
+        for shard, result in enumerate(results)
+    ]
+
+
+async def crawl_brands(
+    brands: List[Brand], workers: int, notifier: NotificationQueue
+) -> Optional[Dict[str, Set[int]]]:
+    """
+    Crawl the brands once, sharded across processes when ``workers`` > 1.
+
+    Returns:
+        Optional[Dict[str, Set[int]]]: The product ids listed by each brand, or
+            None if pages failed or a shard crashed, in which case the
+            checkpoints are kept so the next attempt resumes.
+    """
+    workers = max(1, min(workers, len(brands)))
+    if workers > 1:
+        results = await crawl_sharded(brands, workers, notifier)
+    else:
+        results = [await crawl_shard(0, 1, brands, notifier)]
+
+    for result in results:
+        registry.merge(result.metrics)
+        if result.error:
+            logger.error(f"Shard {result.shard} crashed: {result.error}")
+        else:
+            logger.info(
+                f"Shard {result.shard}: {result.pages} pages, "
+                f"{result.products} products in {result.elapsed:.1f}s"
+            )
+
+    elapsed = max((result.elapsed for result in results), default=0.0)
+    if elapsed:
+        pages = sum(result.pages for result in results)
+        products = sum(result.products for result in results)
+        SPIDER_CRAWL_RATE.set(pages / elapsed, unit="pages")
+        SPIDER_CRAWL_RATE.set(products / elapsed, unit="products")
+    SPIDER_CRAWL_FINISHED.set(time.time())
+
+    failed = sum(result.failed for result in results)
+    if failed or any(result.error for result in results):
+        logger.warning(
+            f"{failed} pages failed or a shard crashed, keeping the checkpoint "
+            "and skipping stale products cleanup"
+        )
+        return None
+
+    checkpoint = Path(settings.SPIDER_CHECKPOINT_PATH)
+    for path in checkpoint.parent.glob(f"{checkpoint.name}*"):
+        path.unlink(missing_ok=True)
+
+    seen: Dict[str, Set[int]] = {}
+    for result in results:
+        for name, ids in result.seen.items():
+            seen.setdefault(name, set()).update(ids)
+    return seen
+
+
+async def expire_stale_products(seen: Set[int]) -> None:
+    if not seen:
+        logger.warning("Crawl saw no products, skipping stale products cleanup")
+        return
+    expired = await expire_unseen_products(seen)
+    purged = await purge_expired_products()
+    logger.info(f"Expired {expired} unseen products, purged {purged}")
+
+
+async def invalidate_response_cache() -> None:
+    redis = create_redis()
+    try:
+        await bump_generation(redis)
+    except RedisError as ex:
+        logger.warning(f"Could not invalidate the response cache: {ex!r}")
+    finally:
+        await redis.aclose()
+
+
+async def gather_data(workers: int = settings.SPIDER_WORKERS):
+    """
+    Crawl every brand of the catalogue once, then expire the products none of
+    them listed.
+    """
+    catalogue = BrandCatalogue(settings.SPIDER_BRANDS_PATH)
+    notifier = NotificationQueue()
+    notifier.start()
+
+    try:
+        seen = await crawl_brands(catalogue.brands, workers, notifier)
+        if seen is not None:
+            await expire_stale_products(set().union(*seen.values()))
+            CrawlSchedule(settings.SPIDER_SCHEDULE_PATH).mark_crawled(
+                catalogue.brands
+            )
+    finally:
+        await invalidate_response_cache()
+        await notifier.close(timeout=settings.TG_DRAIN_TIMEOUT)
+        registry.write(settings.SPIDER_METRICS_PATH)
+
+
+async def crawl_forever(workers: int = settings.SPIDER_WORKERS):
+    """
+    Keep crawling each brand as its interval elapses.
+
+    The catalogue file is reloaded whenever it changes, so brands and their
+    settings can be edited without a restart. Stale products are expired once
+    every brand has been crawled, against the ids of each brand's latest crawl,
+    so a pass over the hot brands never expires products only cold brands list.
+    """
+    catalogue = BrandCatalogue(settings.SPIDER_BRANDS_PATH)
+    schedule = CrawlSchedule(settings.SPIDER_SCHEDULE_PATH)
+    latest: Dict[str, Set[int]] = {}
+    notifier = NotificationQueue()
+    notifier.start()
+
+    try:
+        while True:
+            try:
+                if catalogue.reload():
+                    logger.info(f"Loaded {len(catalogue.brands)} brands")
+            except (OSError, ValueError) as ex:
+                logger.error(f"Keeping the previous brand catalogue: {ex!r}")
+
+            delay = settings.SPIDER_CATALOGUE_POLL_INTERVAL
+            due = schedule.due(catalogue.brands)
+            if due:
+                try:
+                    seen = await crawl_brands(due, workers, notifier)
+                    if seen is not None:
+                        schedule.mark_crawled(due)
+                        for brand in due:
+                            latest[brand.name] = seen.get(brand.name, set())
+                        names = {brand.name for brand in catalogue.brands}
+                        if names <= latest.keys():
+                            await expire_stale_products(
+                                set().union(*(latest[name] for name in names))
+                            )
+                        delay = min(delay, schedule.next_due_in(catalogue.brands))
+                    await invalidate_response_cache()
+                    registry.write(settings.SPIDER_METRICS_PATH)
+                except Exception as err:
+                    # Brands not marked crawled are due again at the next poll.
+                    logger.error(
+                        f"Crawl of {len(due)} brands failed, retrying in "
+                        f"{delay:.0f}s: {err!r}"
+                    )
+            else:
+                delay = min(delay, schedule.next_due_in(catalogue.brands))
 
-    # Delete old products
-    await delete_old_products()
+            await asyncio.sleep(delay)
+    finally:
+        await notifier.close(timeout=settings.TG_DRAIN_TIMEOUT)
+        registry.write(settings.SPIDER_METRICS_PATH)
 
 
 # def job():
@@ -164,12 +641,39 @@ async def gather_data():
 #                         timezone('Asia/Bishkek')).do(job)
 
 
-async def main():
+async def main(workers: int = settings.SPIDER_WORKERS, forever: bool = False):
     # while True:
     #     schedule.run_pending()
     #     await asyncio.sleep(1)
-    await gather_data()
+    if forever:
+        await crawl_forever(workers)
+    else:
+        await gather_data(workers)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Crawl the ASOS sale listings.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.SPIDER_WORKERS,
+        help="number of processes to shard the brands across",
+    )
+    parser.add_argument(
+        "--forever",
+        action="store_true",
+        help="keep crawling brands as their intervals elapse",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=settings.SPIDER_PROFILE,
+        help=f"write a {settings.PROFILE_MODE} profile of the crawl to {settings.PROFILE_DIR}",
+    )
+    args = parser.parse_args()
+    if args.profile:
+        # Shard processes are spawned and read their settings from the environment.
+        os.environ["SPIDER_PROFILE"] = "true"
+        settings.SPIDER_PROFILE = True
+    with spider_profile("spider"):
+        asyncio.run(main(max(1, args.workers), forever=args.forever))
@@ -1,11 +1,15 @@
 import os
 from dotenv import load_dotenv
 
+from typing import Sequence
+
 from aiogram import Bot
 from aiogram.enums import ParseMode
+from aiogram.types import InputMediaPhoto
 from aiogram.utils import formatting as fm
 
 from src.models.product import ProductOrm
+from src.schemas.product import SProduct
 
 load_dotenv()
 
@@ -13,7 +17,7 @@ bot = Bot(token=os.getenv("BOT_TOKEN"), parse_mode=ParseMode.MARKDOWN_V2)
 user_id = os.getenv("USER_ID")
 
 
-async def send_product_tg(product: ProductOrm):
+def format_product(product: ProductOrm | SProduct) -> str:
     base_url = "https://www.asos.com/"
     if product.selling_fast:
         named_url = fm.TextLink(product.name + " (⚡️)", url=base_url + product.url)
@@ -38,6 +42,26 @@ async def send_product_tg(product: ProductOrm):
         fm.HashTag("_".join(str(product.brand_name).lower().split(" "))),
     )
 
+    return content.as_markdown()
+
+
+async def send_product_tg(product: ProductOrm | SProduct):
     await bot.send_photo(
-        chat_id=user_id, photo=product.images[0], caption=content.as_markdown()
+        chat_id=user_id, photo=product.images[0], caption=format_product(product)
+    )
+
+
+async def send_products_tg(products: Sequence[ProductOrm | SProduct]):
+    """
+    Send several products as one album, each photo captioned with its product.
+    """
+    if len(products) == 1:
+        return await send_product_tg(products[0])
+
+    await bot.send_media_group(
+        chat_id=user_id,
+        media=[
+            InputMediaPhoto(media=product.images[0], caption=format_product(product))
+            for product in products
+        ],
     )
@@ -0,0 +1,160 @@
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, Iterator, Optional
+
+# A complete JSON string, a lone quote (string cut off at the end of the
+# buffer) or a bracket. Brackets inside complete strings are never matched.
+_STRUCTURE = re.compile(r'"(?:[^"\\]|\\.)*"|["\[\]{}]')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+_LITERAL = re.compile(r'[^\s,:\]}]+')
+_WHITESPACE = re.compile(r"[\s,]*")
+
+_OBJECT, _KEY, _COLON, _VALUE, _SKIP, _ARRAY, _ITEM, _DONE = range(8)
+
+
+class JsonArrayStream:
+    """
+    Incrementally parse a JSON object and yield the items of one of its arrays.
+
+    Bytes are consumed as they arrive and each item of ``key`` is decoded with
+    ``json.loads`` as soon as its closing bracket is seen, so the full document
+    is never held in memory. Other containers are skipped without buffering and
+    top-level scalar values are collected in ``scalars``.
+
+    Usage:
+        stream = JsonArrayStream(response.content.iter_any(), key="products")
+        async for product in stream:
+            ...
+        total = stream.scalars.get("itemCount")
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], key: str):
+        self.key = key
+        self.scalars: dict[str, Any] = {}
+        self._chunks = chunks
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = _OBJECT
+        self._current_key: Optional[str] = None
+        self._start = 0
+        self._depth = 0
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        async for chunk in self._chunks:
+            for item in self._feed(self._decoder.decode(chunk)):
+                yield item
+        for item in self._feed(self._decoder.decode(b"", final=True), final=True):
+            yield item
+        if self._state != _DONE:
+            raise ValueError("Truncated JSON document")
+
+    def _feed(self, text: str, final: bool = False) -> Iterator[Any]:
+        self._buffer += text
+        while self._state != _DONE:
+            if not self._step(final):
+                break
+            if self._state == _ITEM and self._depth == 0:
+                yield json.loads(self._buffer[self._start : self._pos])
+                self._state = _ARRAY
+        # Drop everything that will not be looked at again.
+        keep = self._start if self._state == _ITEM else self._pos
+        self._buffer = self._buffer[keep:]
+        self._start -= keep
+        self._pos -= keep
+
+    def _step(self, final: bool) -> bool:
+        """
+        Advance the state machine by one token. Returns False when more input
+        is needed.
+        """
+        buffer = self._buffer
+        if self._state in (_SKIP, _ITEM):
+            return self._scan()
+
+        self._pos = _WHITESPACE.match(buffer, self._pos).end()
+        if self._pos >= len(buffer):
+            return False
+        char = buffer[self._pos]
+
+        if self._state == _OBJECT:
+            if char != "{":
+                raise ValueError(f"Expected a JSON object, got {char!r}")
+            self._pos += 1
+            self._state = _KEY
+        elif self._state == _KEY:
+            if char == "}":
+                self._pos += 1
+                self._state = _DONE
+                return True
+            match = _STRING.match(buffer, self._pos)
+            if not match:
+                return False
+            self._current_key = json.loads(match.group())
+            self._pos = match.end()
+            self._state = _COLON
+        elif self._state == _COLON:
+            if char != ":":
+                raise ValueError(f"Expected ':', got {char!r}")
+            self._pos += 1
+            self._state = _VALUE
+        elif self._state == _VALUE:
+            if char == "[" and self._current_key == self.key:
+                self._pos += 1
+                self._state = _ARRAY
+            elif char in "[{":
+                self._depth = 0
+                self._state = _SKIP
+            else:
+                value = self._scalar(final)
+                if value is _INCOMPLETE:
+                    return False
+                self.scalars[self._current_key] = value
+                self._state = _KEY
+        elif self._state == _ARRAY:
+            if char == "]":
+                self._pos += 1
+                self._state = _KEY
+            elif char in "[{":
+                self._start = self._pos
+                self._depth = 0
+                self._state = _ITEM
+                return self._scan()
+            else:
+                raise ValueError(f"Expected an object or array item, got {char!r}")
+        return True
+
+    def _scan(self) -> bool:
+        """
+        Walk the brackets of the current container until it is closed.
+        """
+        for match in _STRUCTURE.finditer(self._buffer, self._pos):
+            token = match.group()
+            if token == '"':
+                self._pos = match.start()
+                return False
+            if token in "[{":
+                self._depth += 1
+            elif token in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._pos = match.end()
+                    if self._state == _SKIP:
+                        self._state = _KEY
+                    return True
+        self._pos = len(self._buffer)
+        return False
+
+    def _scalar(self, final: bool) -> Any:
+        buffer = self._buffer
+        pattern = _STRING if buffer[self._pos] == '"' else _LITERAL
+        match = pattern.match(buffer, self._pos)
+        # A literal touching the end of the buffer may still be growing.
+        if not match or (match.end() == len(buffer) and not final):
+            return _INCOMPLETE
+        self._pos = match.end()
+        return json.loads(match.group())
+
+
+_INCOMPLETE = object()
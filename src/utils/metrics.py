@@ -0,0 +1,312 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Starlette appends "; charset=utf-8" to text media types.
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """
+    A named family of samples, one per combination of label values.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = [*zip(self.labelnames, key), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{self._labels(key)} {_format_value(value)}"
+
+    @abstractmethod
+    def merge(self, values: Dict[LabelValues, Any]) -> None:
+        """
+        Fold in another process's samples of this metric, as from a snapshot.
+        """
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, values: Dict[LabelValues, Any]) -> None:
+        for key, value in values.items():
+            self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def merge(self, values: Dict[LabelValues, Any]) -> None:
+        self._values.update(values)
+
+
+class Histogram(Metric):
+    """
+    Observations counted into cumulative ``le`` buckets, plus their sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # Per-bucket counts with a trailing +Inf bucket, sum.
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[str]:
+        bounds = [*self.buckets, float("inf")]
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = self._labels(key, (("le", _format_value(float(bound))),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{self._labels(key)} {_format_value(total)}"
+            yield f"{self.name}_count{self._labels(key)} {cumulative}"
+
+    def merge(self, values: Dict[LabelValues, Any]) -> None:
+        for key, (counts, total) in values.items():
+            state = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            state[0] = [a + b for a, b in zip(state[0], counts)]
+            state[1] += total
+
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text exposition format.
+
+    Metrics are plain counters updated from the event loop, so they need no
+    locking. Processes that cannot be scraped, such as the spider and its
+    shard processes, hand a ``snapshot`` to their parent to ``merge`` and
+    ``write`` the result to a file for node_exporter's textfile collector.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[LabelValues, Any]]:
+        """
+        A picklable copy of every metric's samples.
+        """
+        snapshot = {}
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Histogram):
+                values = {k: [list(c), t] for k, (c, t) in metric._values.items()}
+            else:
+                values = dict(metric._values)
+            snapshot[name] = values
+        return snapshot
+
+    def merge(self, snapshot: Dict[str, Dict[LabelValues, Any]]) -> None:
+        """
+        Add another process's counters and histograms to this registry's;
+        its gauges replace ours.
+        """
+        for name, values in snapshot.items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric._values.clear()
+
+    def write(self, path: str) -> None:
+        """
+        Atomically write the metrics to ``path``, e.g. ``spider.prom``.
+        """
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_suffix(".part")
+        partial.write_text(self.render())
+        os.replace(partial, target)
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "API request latency by route template.",
+    ("method", "route", "status"),
+)
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_duration_seconds",
+    "Time spent executing SQL statements, by leading keyword.",
+    ("operation",),
+    buckets=QUERY_BUCKETS,
+)
+DB_POOL_WAIT_SECONDS = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool.",
+    buckets=QUERY_BUCKETS,
+)
+DB_POOL_CONNECTIONS = registry.gauge(
+    "db_pool_connections",
+    "Connections in the pool by state.",
+    ("state",),
+)
+ASOS_RESPONSES = registry.counter(
+    "spider_asos_responses_total",
+    "Responses from the ASOS search API by HTTP status; 'error' counts requests "
+    "that failed without a response.",
+    ("status",),
+)
+ASOS_REQUEST_SECONDS = registry.histogram(
+    "spider_asos_request_duration_seconds",
+    "Time until the ASOS search API sent response headers.",
+)
+SPIDER_PAGE_SECONDS = registry.histogram(
+    "spider_page_duration_seconds",
+    "Time per crawled page spent fetching and parsing it or saving it.",
+    ("stage",),
+)
+SPIDER_PAGES = registry.counter(
+    "spider_pages_total", "Search pages crawled.", ("brand",)
+)
+SPIDER_PRODUCTS = registry.counter(
+    "spider_products_total", "Products listed by crawled pages.", ("brand",)
+)
+SPIDER_CRAWL_RATE = registry.gauge(
+    "spider_last_crawl_per_second",
+    "Pages and products per second of the last crawl.",
+    ("unit",),
+)
+SPIDER_CRAWL_FINISHED = registry.gauge(
+    "spider_last_crawl_timestamp_seconds",
+    "When the last crawl finished, as a Unix timestamp.",
+)
+TELEGRAM_SEND_SECONDS = registry.histogram(
+    "telegram_send_duration_seconds",
+    "Telegram album send latency by outcome.",
+    ("outcome",),
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request into ``HTTP_REQUEST_SECONDS``.
+
+    Requests are labelled with the matched route's path template, e.g.
+    ``/api/products/{product_slug}``, so the label set stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status: Optional[int] = None
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status or 500,
+            )
@@ -0,0 +1,186 @@
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from src.utils.logging import AppLogger
+
+logger = AppLogger().get_logger()
+
+PROFILE_MODES = ("sample", "cprofile")
+
+
+class StackSampler:
+    """
+    Sampling profiler for one thread, by default the calling one.
+
+    A background thread records the target thread's Python stack every
+    ``interval`` seconds. ``write`` saves the samples as collapsed stacks
+    (``frame;frame;frame count`` per line), the input format of flamegraph.pl,
+    speedscope and inferno. Under asyncio the stacks show the coroutine
+    running at that moment, or the event loop waiting in ``select`` when idle.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter[str] = Counter()
+        self._labels: Dict[object, str] = {}
+        # Longest first, so site-packages wins over the stdlib directory.
+        self._roots = sorted(
+            {os.path.abspath(entry) for entry in sys.path if entry} | {os.getcwd()},
+            key=len,
+            reverse=True,
+        )
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            for root in self._roots:
+                if filename.startswith(root + os.sep):
+                    filename = filename[len(root) + 1 :]
+                    break
+            label = self._labels[code] = (
+                f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            )
+        return label
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write(self, path: Path) -> None:
+        with path.open("w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+def profile_path(directory: str, name: str, mode: str) -> Path:
+    """
+    A unique dump path, e.g. ``spider-20240101T120000-1234.folded``.
+    """
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "root"
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    suffix = ".folded" if mode == "sample" else ".prof"
+    return Path(directory) / f"{name}-{stamp}-{os.getpid()}{suffix}"
+
+
+@contextmanager
+def profiled(path: Path, mode: str = "sample", interval: float = 0.005) -> Iterator[None]:
+    """
+    Profile the calling thread for the duration of the block and write the
+    result to ``path`` on exit, including when the block raises.
+
+    ``sample`` mode writes collapsed stacks for a flamegraph; ``cprofile``
+    writes a pstats dump (e.g. for snakeviz). cProfile traces every call, so
+    it is exact but slows the code down considerably; sampling is cheap.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode {mode!r}, expected one of {PROFILE_MODES}")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+    else:
+        sampler = StackSampler(interval)
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            sampler.write(path)
+    logger.info(f"Wrote {mode} profile to {path}")
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling a random ``sample_rate`` share of HTTP requests,
+    and requests whose ``header`` carries ``token``, into ``directory``.
+
+    Profilers see the whole event loop thread, so other requests served at the
+    same time show up in a dump too; only one request is profiled at a time to
+    keep dumps apart. The dump is written synchronously on the event loop when
+    the request finishes, stalling it briefly, so keep ``sample_rate`` low.
+    Header-triggered profiling is off unless a token is set.
+    """
+
+    def __init__(
+        self,
+        app,
+        directory: str,
+        mode: str = "sample",
+        sample_rate: float = 0.0,
+        header: str = "X-Profile",
+        token: Optional[str] = None,
+        interval: float = 0.005,
+    ):
+        if mode not in PROFILE_MODES:
+            raise ValueError(
+                f"Unknown profile mode {mode!r}, expected one of {PROFILE_MODES}"
+            )
+        self.app = app
+        self.directory = directory
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode()
+        self.token = token.encode() if token else None
+        self.interval = interval
+        self._busy = False
+
+    def _wanted(self, scope) -> bool:
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == self.header and hmac.compare_digest(value, self.token):
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._busy or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        name = f"{scope['method']}{scope['path']}"
+        self._busy = True
+        try:
+            with profiled(
+                profile_path(self.directory, name, self.mode), self.mode, self.interval
+            ):
+                await self.app(scope, receive, send)
+        finally:
+            self._busy = False
@@ -0,0 +1,30 @@
+import os
+
+import pytest
+from dotenv import load_dotenv
+
+# Settings are read when ``src.config`` is first imported. These placeholders
+# let the tests that need no services import the app without a ``.env``;
+# values from the environment or ``.env`` take precedence.
+load_dotenv()
+for name, value in {
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "REDIS_DB": "0",
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "postgres",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_EXPIRE": "3600",
+    "SECRET_KEY": "test-secret",
+    "BOT_TOKEN": "123:ABC",
+    "USER_ID": "1",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+
+from src.schemas.product import SProduct
+
+
+def make_product(id: int, price: float = 30.0, **fields) -> SProduct:
+    """
+    A product as the spider parses it, at ``price`` down from 60.
+    """
+    return SProduct(
+        **{
+            "id": id,
+            "name": f"Test product {id}",
+            "brand_name": "Test",
+            "current_price": price,
+            "previous_price": 60.0,
+            "discount_percent": round((1 - price / 60) * 100),
+            "currency": "GBP",
+            "url": f"test/prd/{id}",
+            "images": [f"images.asos-media.com/products/test/{id}-1"],
+            "product_code": id,
+            "selling_fast": False,
+            "updated_at": datetime.now(timezone.utc),
+            **fields,
+        }
+    )
@@ -0,0 +1,187 @@
+import asyncio
+from time import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+from jose import jwt
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+import src.services.auth as auth
+from src.config import settings
+from src.main import app
+from src.utils.ttl_cache import TTLCache
+
+
+def make_token(expiry: float, key: str = settings.SECRET_KEY) -> str:
+    payload = {"email": "staff@example.com", "expiry": expiry, "platform": "test"}
+    return jwt.encode(payload, key, algorithm=settings.JWT_ALGORITHM)
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def subscribe(self, channel):
+        if self.redis.failures:
+            self.redis.failures -= 1
+            raise RedisConnectionError("connection refused")
+        self.redis.subscribed.set()
+
+    async def listen(self):
+        yield {"type": "subscribe", "data": 1}
+        while True:
+            yield {"type": "message", "data": await self.redis.published.get()}
+
+
+class FakeRedis:
+    def __init__(self, failures: int = 0):
+        self.tokens = {}
+        self.gets = 0
+        self.failures = failures
+        self.subscribed = asyncio.Event()
+        self.published: asyncio.Queue[bytes] = asyncio.Queue()
+
+    async def get(self, key):
+        self.gets += 1
+        return self.tokens.get(key)
+
+    async def delete(self, key):
+        self.tokens.pop(key, None)
+
+    async def publish(self, channel, message):
+        self.published.put_nowait(message.encode())
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    auth.confirmed_tokens.clear()
+    yield
+    auth.confirmed_tokens.clear()
+
+
+def test_decode_token_returns_expiry():
+    expiry = time() + 60
+
+    assert auth.decode_token(make_token(expiry)) == pytest.approx(expiry)
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        make_token(time() - 1),
+        make_token(time() + 60, key="another-secret"),
+        jwt.encode({"email": "a"}, settings.SECRET_KEY, settings.JWT_ALGORITHM),
+        jwt.encode({"expiry": "soon"}, settings.SECRET_KEY, settings.JWT_ALGORITHM),
+        "not.a.token",
+        "",
+    ],
+)
+def test_decode_token_rejects_bad_tokens(token):
+    with pytest.raises(HTTPException) as info:
+        auth.decode_token(token)
+
+    assert info.value.status_code == 403
+
+
+@pytest.mark.anyio
+async def test_revocations_evict_cached_tokens():
+    redis = FakeRedis()
+    cache: TTLCache[float] = TTLCache(maxsize=10, ttl=60)
+    cache.set("stale", 1.0)
+    listener = asyncio.create_task(auth.listen_for_revocations(redis, cache))
+    await redis.subscribed.wait()
+    # Announcements made before the subscription could have been missed.
+    assert cache.get("stale") is None
+
+    cache.set("revoked", 1.0)
+    cache.set("kept", 1.0)
+    await auth.revoke_token(redis, "revoked")
+    while cache.get("revoked") is not None:
+        await asyncio.sleep(0)
+    listener.cancel()
+
+    assert cache.get("kept") == 1.0
+
+
+@pytest.mark.anyio
+async def test_listener_resubscribes_after_redis_errors(monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(auth.asyncio, "sleep", sleep)
+    redis = FakeRedis(failures=3)
+    listener = asyncio.create_task(
+        auth.listen_for_revocations(redis, TTLCache(maxsize=10, ttl=60))
+    )
+    await redis.subscribed.wait()
+    listener.cancel()
+
+    assert delays == [1.0, 2.0, 4.0]
+
+
+def test_logout_revokes_the_token(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(app.state, "redis", redis, raising=False)
+    token = make_token(time() + 60)
+    redis.tokens[token] = "payload"
+    headers = {"Authorization": f"Bearer {token}"}
+    client = TestClient(app)
+
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+    assert redis.published.get_nowait() == token.encode()
+    assert client.post("/api/auth/logout", headers=headers).status_code == 403
+
+
+def bearer_request(redis: FakeRedis, token: str) -> Request:
+    scope = {
+        "type": "http",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+        "app": SimpleNamespace(state=SimpleNamespace(redis=redis)),
+    }
+    return Request(scope)
+
+
+@pytest.mark.anyio
+async def test_confirmed_tokens_are_cached():
+    redis = FakeRedis()
+    token = make_token(time() + 60)
+    redis.tokens[token] = "payload"
+
+    for _ in range(3):
+        assert await auth.AuthBearer()(bearer_request(redis, token)) == token
+
+    assert redis.gets == 1
+
+
+@pytest.mark.anyio
+async def test_token_confirmed_during_a_revocation_is_not_cached(monkeypatch):
+    redis = FakeRedis()
+    token = make_token(time() + 60)
+    redis.tokens[token] = "payload"
+    confirm_token = auth.confirm_token
+
+    async def confirm_then_revoke(request, token):
+        expiry = await confirm_token(request, token)
+        # The revocation lands after Redis said the token was still issued,
+        # so the listener had nothing to evict yet.
+        auth.revocations_seen += 1
+        return expiry
+
+    monkeypatch.setattr(auth, "confirm_token", confirm_then_revoke)
+
+    await auth.AuthBearer()(bearer_request(redis, token))
+
+    assert auth.confirmed_tokens.get(token) is None
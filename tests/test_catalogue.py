@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import src.spider
+from src.catalogue import Brand, BrandCatalogue, CrawlSchedule, load_brands
+from src.config import settings
+from src.notifier import NotificationQueue
+
+HOUR = 60 * 60
+
+
+def brand(name: str, interval: float = HOUR, priority: int = 0) -> Brand:
+    return Brand(name=name, url=f"{name}?", interval=interval, priority=priority)
+
+
+def write_catalogue(path, brands, defaults=None) -> None:
+    path.write_text(json.dumps({"defaults": defaults or {}, "brands": brands}))
+
+
+def test_brands_fall_back_to_defaults(tmp_path):
+    path = tmp_path / "brands.json"
+    write_catalogue(
+        path,
+        [
+            {"name": "Nike", "url": "1?"},
+            {"name": "Vans", "url": "2?", "interval_minutes": 5, "priority": 2},
+        ],
+        defaults={"interval_minutes": 60, "discount_threshold": 30},
+    )
+
+    nike, vans = load_brands(path)
+
+    assert (nike.interval, nike.priority, nike.discount_threshold) == (HOUR, 0, 30)
+    assert (vans.interval, vans.priority, vans.discount_threshold) == (300, 2, 30)
+
+
+@pytest.mark.parametrize(
+    "brands",
+    [
+        [{"name": "Nike"}],
+        [{"name": "Nike", "url": "1?"}, {"name": "Nike", "url": "2?"}],
+    ],
+)
+def test_invalid_catalogue_is_rejected(tmp_path, brands):
+    path = tmp_path / "brands.json"
+    write_catalogue(path, brands, defaults={"interval_minutes": 60})
+
+    with pytest.raises(ValueError):
+        load_brands(path)
+
+
+def test_catalogue_reloads_only_when_the_file_changes(tmp_path):
+    path = tmp_path / "brands.json"
+    write_catalogue(path, [{"name": "Nike", "url": "1?", "interval_minutes": 60}])
+    catalogue = BrandCatalogue(str(path))
+
+    assert catalogue.reload() is False
+
+    write_catalogue(path, [{"name": "Vans", "url": "2?", "interval_minutes": 60}])
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))
+
+    assert catalogue.reload() is True
+    assert [brand.name for brand in catalogue.brands] == ["Vans"]
+
+
+def test_invalid_edit_keeps_the_previous_brands(tmp_path):
+    path = tmp_path / "brands.json"
+    write_catalogue(path, [{"name": "Nike", "url": "1?", "interval_minutes": 60}])
+    catalogue = BrandCatalogue(str(path))
+
+    path.write_text("{not json")
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))
+
+    with pytest.raises(ValueError):
+        catalogue.reload()
+    assert [brand.name for brand in catalogue.brands] == ["Nike"]
+
+
+def test_never_crawled_brands_are_due_highest_priority_first(tmp_path):
+    schedule = CrawlSchedule(str(tmp_path / "schedule.json"))
+    brands = [brand("Nike"), brand("Vans", priority=2), brand("UGG", priority=1)]
+
+    due = schedule.due(brands, now=10_000)
+
+    assert [brand.name for brand in due] == ["Vans", "UGG", "Nike"]
+    assert schedule.next_due_in(brands, now=10_000) == 0
+
+
+def test_brands_are_due_again_after_their_interval(tmp_path):
+    schedule = CrawlSchedule(str(tmp_path / "schedule.json"))
+    hot, cold = brand("Nike", interval=600), brand("Vans", interval=HOUR)
+    schedule.mark_crawled([hot, cold], at=10_000)
+
+    assert schedule.due([hot, cold], now=10_000 + 599) == []
+    assert schedule.next_due_in([hot, cold], now=10_000 + 599) == 1
+    assert schedule.due([hot, cold], now=10_000 + 600) == [hot]
+    assert schedule.due([hot, cold], now=10_000 + HOUR) == [hot, cold]
+
+
+def test_schedule_survives_a_restart(tmp_path):
+    path = str(tmp_path / "schedule.json")
+    nike = brand("Nike")
+    CrawlSchedule(path).mark_crawled([nike], at=10_000)
+
+    restarted = CrawlSchedule(path)
+
+    assert restarted.due([nike], now=10_000 + 60) == []
+    assert restarted.next_due_in([nike], now=10_000 + 60) == HOUR - 60
+
+
+def test_unreadable_schedule_treats_every_brand_as_due(tmp_path):
+    path = tmp_path / "schedule.json"
+    path.write_text("{cut sho")
+
+    assert CrawlSchedule(str(path)).due([brand("Nike")], now=10_000) == [brand("Nike")]
+
+
+def test_no_brands_means_nothing_is_ever_due(tmp_path):
+    schedule = CrawlSchedule(str(tmp_path / "schedule.json"))
+
+    assert schedule.next_due_in([], now=0) == float("inf")
+
+
+@pytest.mark.anyio
+async def test_failed_pass_is_retried_at_the_next_poll(tmp_path, monkeypatch):
+    catalogue = tmp_path / "brands.json"
+    write_catalogue(catalogue, [{"name": "Nike", "url": "1?", "interval_minutes": 60}])
+    monkeypatch.setattr(settings, "SPIDER_BRANDS_PATH", str(catalogue))
+    monkeypatch.setattr(settings, "SPIDER_SCHEDULE_PATH", str(tmp_path / "schedule.json"))
+    monkeypatch.setattr(settings, "SPIDER_METRICS_PATH", str(tmp_path / "spider.prom"))
+    monkeypatch.setattr(
+        src.spider,
+        "NotificationQueue",
+        lambda: NotificationQueue(str(tmp_path / "queue.jsonl")),
+    )
+    passes = []
+
+    async def crawl_brands(due, workers, notifier):
+        passes.append([brand.name for brand in due])
+        if len(passes) == 1:
+            raise RuntimeError("database down")
+        raise asyncio.CancelledError
+
+    async def sleep(delay):
+        assert delay == settings.SPIDER_CATALOGUE_POLL_INTERVAL
+
+    monkeypatch.setattr(src.spider, "crawl_brands", crawl_brands)
+    monkeypatch.setattr(src.spider.asyncio, "sleep", sleep)
+
+    with pytest.raises(asyncio.CancelledError):
+        await src.spider.crawl_forever(workers=1)
+
+    assert passes == [["Nike"], ["Nike"]]
@@ -0,0 +1,215 @@
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+import src.spider
+from src.catalogue import PAGE_SIZE, Brand
+from src.checkpoint import CrawlCheckpoint
+from src.config import settings
+from src.spider import CrawlScheduler, ShardResult
+
+
+def asos_product(id: int) -> dict:
+    return {
+        "id": id,
+        "name": f"Product {id}",
+        "brandName": "Test",
+        "price": {
+            "current": {"value": 10.0},
+            "previous": {"value": 20.0},
+            "currency": "GBP",
+        },
+        "url": f"test/prd/{id}",
+        "imageUrl": f"images.asos-media.com/products/{id}",
+        "additionalImageUrls": [],
+        "productCode": id,
+        "isSellingFast": False,
+    }
+
+
+class FakeFetcher:
+    """
+    Serves one product per page, whose id is the page number plus one.
+    """
+
+    def __init__(self, item_counts: dict):
+        self.item_counts = item_counts
+        self.fetched = []
+
+    def is_fresh(self, key: str, url: str) -> bool:
+        return True
+
+    @asynccontextmanager
+    async def fetch(self, key: str, url: str):
+        self.fetched.append(key)
+        brand, offset = key.rsplit("-", 1)
+        document = {
+            "products": [asos_product(int(offset) // PAGE_SIZE + 1)],
+            "itemCount": self.item_counts[brand],
+        }
+
+        async def chunks():
+            yield json.dumps(document).encode()
+
+        yield chunks()
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    pages = []
+
+    async def save_page(page, *args, **kwargs):
+        pages.append(page)
+
+    monkeypatch.setattr(src.spider, "save_page", save_page)
+    return pages
+
+
+def test_finished_pages_survive_a_restart(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = CrawlCheckpoint(str(path), max_age=60)
+    checkpoint.mark_done("Nike", 0, item_count=500, ids=[1, 2])
+    checkpoint.mark_done("Nike", 199, ids=[3])
+
+    resumed = CrawlCheckpoint(str(path), max_age=60)
+
+    assert resumed.done == {("Nike", 0), ("Nike", 199)}
+    assert resumed.item_counts == {"Nike": 500}
+    assert resumed.seen_ids == {"Nike": {1, 2, 3}}
+
+
+def test_line_cut_short_by_the_interruption_is_ignored(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    CrawlCheckpoint(str(path), max_age=60).mark_done("Nike", 0, item_count=500)
+    with path.open("a") as file:
+        file.write('{"brand": "Nike", "off')
+
+    resumed = CrawlCheckpoint(str(path), max_age=60)
+
+    assert resumed.done == {("Nike", 0)}
+
+
+def test_stale_checkpoint_is_discarded(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    CrawlCheckpoint(str(path), max_age=60).mark_done("Nike", 0, item_count=500)
+    an_hour_ago = time.time() - 3600
+    os.utime(path, (an_hour_ago, an_hour_ago))
+
+    resumed = CrawlCheckpoint(str(path), max_age=60)
+
+    assert len(resumed) == 0
+    assert not path.exists()
+
+
+def test_clear_forgets_progress(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = CrawlCheckpoint(str(path), max_age=60)
+    checkpoint.mark_done("Nike", 0, item_count=500, ids=[1])
+
+    checkpoint.clear()
+
+    assert len(checkpoint) == 0 and not checkpoint.item_counts
+    assert len(CrawlCheckpoint(str(path), max_age=60)) == 0
+
+
+@pytest.mark.anyio
+async def test_resumed_crawl_fetches_only_unfinished_pages(tmp_path, saved):
+    path = str(tmp_path / "checkpoint.jsonl")
+    nike = Brand(name="Nike", url="1?", interval=0)
+    vans = Brand(name="Vans", url="2?", interval=0)
+    interrupted = CrawlCheckpoint(path, max_age=60)
+    interrupted.mark_done("Nike", 0, item_count=3 * PAGE_SIZE, ids=[1])
+    interrupted.mark_done("Nike", PAGE_SIZE, ids=[2])
+    fetcher = FakeFetcher({"Nike": 3 * PAGE_SIZE, "Vans": 1})
+    scheduler = CrawlScheduler(
+        fetcher,
+        fingerprints=None,
+        notifier=None,
+        checkpoint=CrawlCheckpoint(path, max_age=60),
+        concurrency=2,
+        rate=1000,
+    )
+
+    await scheduler.run([nike, vans])
+
+    assert sorted(fetcher.fetched) == [f"Nike-{2 * PAGE_SIZE}", "Vans-0"]
+    assert scheduler.failed == []
+    # Ids listed before the interruption still count as seen.
+    assert scheduler.seen == {"Nike": {1, 2, 3}, "Vans": {1}}
+    assert CrawlCheckpoint(path, max_age=60).done == {
+        ("Nike", 0),
+        ("Nike", PAGE_SIZE),
+        ("Nike", 2 * PAGE_SIZE),
+        ("Vans", 0),
+    }
+
+
+@pytest.mark.anyio
+async def test_brand_moved_to_another_shard_keeps_its_complete_ids(
+    tmp_path, saved, monkeypatch
+):
+    nike = Brand(name="Nike", url="1?", interval=0)
+    vans = Brand(name="Vans", url="2?", interval=0)
+    fetcher = FakeFetcher({"Nike": 1, "Vans": 2 * PAGE_SIZE})
+    # An unfinished pass left Vans half crawled in shard 1's checkpoint.
+    stale = CrawlCheckpoint(str(tmp_path / "shard-2.jsonl"), max_age=60)
+    stale.mark_done("Vans", 0, item_count=2 * PAGE_SIZE, ids=[1])
+
+    results = []
+    for shard, brands in enumerate([[vans], [nike]]):
+        scheduler = CrawlScheduler(
+            fetcher,
+            fingerprints=None,
+            notifier=None,
+            checkpoint=CrawlCheckpoint(
+                str(tmp_path / f"shard-{shard + 1}.jsonl"), max_age=60
+            ),
+            rate=1000,
+        )
+        await scheduler.run(brands)
+        results.append(ShardResult(shard=shard, seen=scheduler.seen))
+
+    async def crawl_sharded(brands, workers, notifier):
+        return results
+
+    monkeypatch.setattr(src.spider, "crawl_sharded", crawl_sharded)
+    monkeypatch.setattr(
+        settings, "SPIDER_CHECKPOINT_PATH", str(tmp_path / "checkpoint.jsonl")
+    )
+
+    seen = await src.spider.crawl_brands([vans, nike], workers=2, notifier=None)
+
+    assert results[1].seen == {"Nike": {1}}
+    assert seen == {"Vans": {1, 2}, "Nike": {1}}
+
+
+@pytest.mark.anyio
+async def test_retried_pages_are_fetched_once_per_round(tmp_path, monkeypatch):
+    failed_once = set()
+
+    async def save_page(page, *args, **kwargs):
+        if page[0].id not in failed_once:
+            failed_once.add(page[0].id)
+            raise RuntimeError("deadlock detected")
+
+    monkeypatch.setattr(src.spider, "save_page", save_page)
+    fetcher = FakeFetcher({"Nike": 3 * PAGE_SIZE})
+    scheduler = CrawlScheduler(
+        fetcher,
+        fingerprints=None,
+        notifier=None,
+        checkpoint=CrawlCheckpoint(str(tmp_path / "checkpoint.jsonl"), max_age=60),
+        rate=1000,
+        retry_rounds=2,
+    )
+
+    await scheduler.run([Brand(name="Nike", url="1?", interval=0)])
+
+    # Each page fails its first save and succeeds on its retry.
+    assert sorted(fetcher.fetched) == sorted(
+        [f"Nike-{offset}" for offset in (0, PAGE_SIZE, 2 * PAGE_SIZE)] * 2
+    )
+    assert scheduler.failed == []
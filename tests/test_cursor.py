@@ -0,0 +1,118 @@
+import decimal
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.schemas.product import ProductSort
+from src.services.product import parse_sort_key, product_sort_key
+from src.utils.cursor import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def client():
+    # The cursor is checked before Redis or the database is touched.
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        (50, 1234),
+        ("discount", 67, 987654),
+        ("newest", "2024-01-01T12:00:00.123456+00:00", 1),
+        (0.731, "Nike \"Air\" ünïcode", None),
+    ],
+)
+def test_cursor_round_trip(values):
+    cursor = encode_cursor(*values)
+
+    assert decode_cursor(cursor, size=len(values)) == list(values)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor("????>>>>", 2**40)
+
+    assert cursor.isascii() and not set(cursor) & set("+/=")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        "%%%",
+        encode_cursor(1, 2)[:-3],
+        # Valid base64 and JSON, but not a list of the right size.
+        encode_cursor(1),
+        encode_cursor(1, 2, 3),
+        "eyJhIjoxfQ",
+    ],
+)
+def test_bad_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, size=2)
+
+
+def test_product_list_rejects_bad_cursor(client):
+    response = client.get("/api/products/", params={"cursor": "garbage"})
+
+    assert response.status_code == 400
+
+
+def test_product_search_rejects_bad_cursor(client):
+    response = client.get(
+        "/api/products/search", params={"q": "nike", "cursor": encode_cursor(1)}
+    )
+
+    assert response.status_code == 400
+
+
+ROW = SimpleNamespace(
+    id=42,
+    discount_percent=67,
+    # List rows carry float prices, ORM objects Decimal ones.
+    current_price=19.99,
+    updated_at=datetime(2024, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc),
+)
+
+
+@pytest.mark.parametrize(
+    "sort, expected",
+    [
+        (ProductSort.discount, 67),
+        (ProductSort.price_asc, decimal.Decimal("19.99")),
+        (ProductSort.price_desc, decimal.Decimal("19.99")),
+        (ProductSort.newest, ROW.updated_at),
+    ],
+)
+def test_sort_key_round_trip(sort, expected):
+    cursor = encode_cursor(sort.value, *product_sort_key(ROW, sort))
+    _, *keyset = decode_cursor(cursor, size=3)
+
+    assert parse_sort_key(sort, *keyset) == (expected, 42)
+
+
+@pytest.mark.parametrize(
+    "sort, value, id",
+    [
+        (ProductSort.discount, "many", 1),
+        (ProductSort.price_asc, "cheap", 1),
+        (ProductSort.price_desc, None, 1),
+        (ProductSort.newest, "yesterday", 1),
+        (ProductSort.newest, 1700000000, 1),
+        (ProductSort.discount, 50, "one"),
+    ],
+)
+def test_bad_sort_key_is_rejected(sort, value, id):
+    with pytest.raises(ValueError):
+        parse_sort_key(sort, value, id)
+
+
+def test_product_list_rejects_cursor_of_another_order(client):
+    cursor = encode_cursor(ProductSort.discount.value, 67, 42)
+
+    response = client.get("/api/products/", params={"cursor": cursor, "sort": "newest"})
+
+    assert response.status_code == 400
@@ -0,0 +1,112 @@
+import aiohttp
+import pytest
+
+from src.fetcher import Fetcher, ResponseCache, RetryableResponse
+
+pytestmark = pytest.mark.anyio
+
+URL = "https://www.asos.com/api/product/search/v2/categories/1?offset=0"
+
+
+class FakeContent:
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+
+class FakeResponse:
+    def __init__(self, status=200, chunks=(), headers=None, error=None):
+        self.status = status
+        self.headers = headers or {}
+        self.content = FakeContent(chunks, error)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    async def get(self, url, headers):
+        self.requests.append((url, headers))
+        return self.responses.pop(0)
+
+
+async def read(fetcher: Fetcher, url: str = URL) -> bytes:
+    async with fetcher.fetch("Nike-0", url) as chunks:
+        return b"".join([chunk async for chunk in chunks])
+
+
+async def test_entry_is_not_served_for_another_url(tmp_path):
+    session = FakeSession(
+        FakeResponse(chunks=[b"old query"], headers={"ETag": '"a"'}),
+        FakeResponse(chunks=[b"new query"]),
+    )
+    fetcher = Fetcher(session, ResponseCache(str(tmp_path), ttl=60))
+    await read(fetcher)
+    edited = URL.replace("categories/1", "categories/2")
+
+    assert not fetcher.is_fresh("Nike-0", edited)
+    assert await read(fetcher, edited) == b"new query"
+    # Not revalidated with the old query's ETag either.
+    assert session.requests[1] == (edited, {})
+    assert fetcher.is_fresh("Nike-0", edited)
+
+
+@pytest.mark.parametrize("header, retry_after", [("30", 30.0), ("soon", None)])
+async def test_throttled_response_carries_retry_after(header, retry_after):
+    session = FakeSession(FakeResponse(status=429, headers={"Retry-After": header}))
+
+    with pytest.raises(RetryableResponse) as info:
+        await read(Fetcher(session))
+
+    assert (info.value.status, info.value.retry_after) == (429, retry_after)
+
+
+async def test_not_modified_serves_the_cached_body(tmp_path):
+    session = FakeSession(
+        FakeResponse(chunks=[b"cached ", b"page"], headers={"ETag": '"a"'}),
+        FakeResponse(status=304),
+    )
+    # Always stale, so the second fetch revalidates.
+    fetcher = Fetcher(session, ResponseCache(str(tmp_path), ttl=0))
+    await read(fetcher)
+
+    assert await read(fetcher) == b"cached page"
+    assert session.requests[1] == (URL, {"If-None-Match": '"a"'})
+
+
+async def test_truncated_read_keeps_the_previous_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    session = FakeSession(
+        FakeResponse(chunks=[b"old page"], headers={"ETag": '"a"'}),
+        FakeResponse(
+            chunks=[b"new pa"],
+            headers={"ETag": '"b"'},
+            error=aiohttp.ClientPayloadError("connection reset"),
+        ),
+    )
+    fetcher = Fetcher(session, cache)
+    await read(fetcher)
+
+    with pytest.raises(aiohttp.ClientPayloadError):
+        await read(fetcher)
+
+    cached = cache.get("Nike-0", URL)
+    assert cached.etag == '"a"'
+    assert cached.body.read_bytes() == b"old page"
+    assert list(tmp_path.glob("*.part")) == []
@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+import pytest
+
+import src.spider
+from src.services.fingerprint import FingerprintIndex, product_fingerprint
+from src.services.product import UpsertResult
+from src.spider import save_page
+from tests.factories import make_product
+
+
+class FakeUnitOfWork:
+    def __init__(self):
+        self.sessions = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def session(self):
+        self.sessions += 1
+        return None
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeNotifier:
+    def __init__(self):
+        self.products = []
+
+    def put(self, product):
+        self.products.append(product)
+
+
+def test_fingerprint_ignores_crawl_time():
+    product = make_product(1)
+    later = product.model_copy(update={"updated_at": product.updated_at + timedelta(1)})
+
+    assert product_fingerprint(product) == product_fingerprint(later)
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"current_price": 29.99},
+        {"previous_price": None},
+        {"discount_percent": 51},
+        {"currency": "EUR"},
+        {"selling_fast": True},
+        {"images": ["images.asos-media.com/products/test/1-2"]},
+    ],
+)
+def test_fingerprint_changes_with_content(fields):
+    product = make_product(1)
+
+    assert product_fingerprint(product) != product_fingerprint(
+        product.model_copy(update=fields)
+    )
+
+
+def test_fingerprint_fits_a_bigint():
+    fingerprint = product_fingerprint(make_product(1))
+
+    assert -(2**63) <= fingerprint < 2**63
+
+
+def test_index_keeps_new_and_changed_products():
+    unchanged, changed, new = make_product(1), make_product(2), make_product(3)
+    index = FingerprintIndex()
+    index.update([unchanged, changed])
+
+    page = [unchanged, make_product(2, price=20.0), new]
+
+    assert [product.id for product in index.changed(page)] == [2, 3]
+
+
+@pytest.mark.anyio
+async def test_save_page_skips_unchanged_pages_without_sql():
+    page = [make_product(1), make_product(2)]
+    index = FingerprintIndex()
+    index.update(page)
+    uow = FakeUnitOfWork()
+
+    await save_page(page, index, FakeNotifier(), uow)
+
+    assert uow.sessions == 0
+
+
+@pytest.mark.anyio
+async def test_save_page_writes_only_changed_products(monkeypatch):
+    written = []
+
+    async def upsert(products, session=None):
+        written.extend(products)
+        return UpsertResult(price_changed=list(products))
+
+    monkeypatch.setattr(src.spider, "upsert_products", upsert)
+    index = FingerprintIndex()
+    index.update([make_product(1)])
+    page = [make_product(1), make_product(2, price=10.0)]
+    notifier = FakeNotifier()
+
+    await save_page(page, index, notifier, FakeUnitOfWork(), discount_threshold=50)
+
+    assert [product.id for product in written] == [2]
+    assert index.changed(page) == []
+    assert [product.id for product in notifier.products] == [2]
+
+
+@pytest.mark.anyio
+async def test_failed_write_leaves_the_index_untouched(monkeypatch):
+    async def upsert(products, session=None):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(src.spider, "upsert_products", upsert)
+    index = FingerprintIndex()
+    page = [make_product(1)]
+    uow = FakeUnitOfWork()
+
+    with pytest.raises(RuntimeError):
+        await save_page(page, index, FakeNotifier(), uow)
+
+    assert uow.rollbacks == 1
+    assert index.changed(page) == page
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from src.utils.json_stream import JsonArrayStream
+
+pytestmark = pytest.mark.anyio
+
+DOCUMENT = {
+    "searchTerm": "",
+    "categoryName": "Nike",
+    "facets": [{"id": "brand", "facetValues": [{"name": "Nike [Sale]"}]}],
+    "products": [
+        {
+            "id": 1,
+            "name": 'Nike "Air" {limited} [1/2]',
+            "price": {"current": {"value": 20.5}, "previous": {"value": None}},
+            "imageUrl": "images.asos-media.com/products/1",
+            "additionalImageUrls": [],
+            "isSellingFast": True,
+        },
+        {
+            "id": 2,
+            "name": "Café crème – naïve 👟 \\ backslash",
+            "price": {"current": {"value": 10}, "previous": {"value": 15.0}},
+            "additionalImageUrls": ["a", "b"],
+            "isSellingFast": False,
+        },
+    ],
+    "itemCount": 2,
+    "redirectUrl": None,
+    "hasMore": False,
+}
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def parse(data: bytes, size: int, key: str = "products"):
+    stream = JsonArrayStream(chunked(data, size), key=key)
+    return [item async for item in stream], stream.scalars
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+async def test_every_chunk_boundary(indent):
+    data = json.dumps(DOCUMENT, indent=indent, ensure_ascii=False).encode()
+
+    for size in range(1, 40):
+        items, scalars = await parse(data, size)
+
+        assert items == DOCUMENT["products"], size
+        assert scalars == {
+            "searchTerm": "",
+            "categoryName": "Nike",
+            "itemCount": 2,
+            "redirectUrl": None,
+            "hasMore": False,
+        }, size
+
+
+async def test_empty_array():
+    items, scalars = await parse(b'{"products": [], "itemCount": 0}', 3)
+
+    assert items == []
+    assert scalars == {"itemCount": 0}
+
+
+async def test_missing_key_yields_nothing():
+    items, scalars = await parse(b'{"itemCount": 0, "facets": [[1], {"a": []}]}', 4)
+
+    assert items == []
+    assert scalars == {"itemCount": 0}
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b'{"products": [{"id": 1}', b'{"products": [', b'{"itemCount": 1', b""],
+)
+async def test_truncated_document(data):
+    with pytest.raises(ValueError):
+        await parse(data, 5)
+
+
+async def test_not_an_object():
+    with pytest.raises(ValueError):
+        await parse(b'[{"id": 1}]', 5)
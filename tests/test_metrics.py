@@ -0,0 +1,98 @@
+import pytest
+
+from src.utils.metrics import MetricsRegistry
+
+
+def test_render_uses_the_text_exposition_format():
+    registry = MetricsRegistry()
+    pages = registry.counter("pages_total", "Pages crawled.", ("brand",))
+    rate = registry.gauge("crawl_rate", "Pages per second.")
+    pages.inc(brand="Nike")
+    pages.inc(2, brand="Nike")
+    rate.set(1.5)
+
+    assert registry.render() == (
+        "# HELP pages_total Pages crawled.\n"
+        "# TYPE pages_total counter\n"
+        'pages_total{brand="Nike"} 3\n'
+        "# HELP crawl_rate Pages per second.\n"
+        "# TYPE crawl_rate gauge\n"
+        "crawl_rate 1.5\n"
+    )
+
+
+def test_label_values_and_help_are_escaped():
+    registry = MetricsRegistry()
+    pages = registry.counter("pages_total", 'Pages per "brand"\\\n.', ("brand",))
+    pages.inc(brand='Levi\'s "Red"\\Tab\n')
+
+    assert registry.render().splitlines() == [
+        '# HELP pages_total Pages per \\"brand\\"\\\\\\n.',
+        "# TYPE pages_total counter",
+        'pages_total{brand="Levi\'s \\"Red\\"\\\\Tab\\n"} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.5, 0.1))
+    for value in (0.05, 0.1, 0.3, 2):
+        latency.observe(value)
+
+    assert list(latency.samples()) == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="0.5"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 2.45",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_labels_must_match_the_declared_names():
+    pages = MetricsRegistry().counter("pages_total", "Pages.", ("brand",))
+
+    with pytest.raises(ValueError):
+        pages.inc(shop="Nike")
+
+
+def test_merge_adds_counters_and_histograms_and_replaces_gauges():
+    def make_registry():
+        registry = MetricsRegistry()
+        registry.counter("pages_total", "Pages.", ("brand",))
+        registry.gauge("crawl_rate", "Pages per second.")
+        registry.histogram("latency_seconds", "Latency.", buckets=(1,))
+        return registry
+
+    parent, shard = make_registry(), make_registry()
+    for registry, rate in ((parent, 1.0), (shard, 2.0)):
+        registry._metrics["pages_total"].inc(brand="Nike")
+        registry._metrics["crawl_rate"].set(rate)
+        registry._metrics["latency_seconds"].observe(rate)
+    shard._metrics["pages_total"].inc(brand="Vans")
+
+    parent.merge(shard.snapshot())
+
+    assert parent.render().splitlines()[2:] == [
+        'pages_total{brand="Nike"} 2',
+        'pages_total{brand="Vans"} 1',
+        "# HELP crawl_rate Pages per second.",
+        "# TYPE crawl_rate gauge",
+        "crawl_rate 2.0",
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="1.0"} 1',
+        'latency_seconds_bucket{le="+Inf"} 2',
+        "latency_seconds_sum 3.0",
+        "latency_seconds_count 2",
+    ]
+
+
+def test_snapshot_is_not_changed_by_later_observations():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(1,))
+    latency.observe(0.5)
+    snapshot = registry.snapshot()
+
+    latency.observe(0.5)
+
+    assert snapshot["latency_seconds"][()] == [[1, 0], 0.5]
@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+import pytest
+
+import src.notifier
+from src.notifier import NotificationQueue
+from tests.factories import make_product
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    albums = []
+
+    async def send_products_tg(products):
+        albums.append([product.id for product in products])
+
+    monkeypatch.setattr(src.notifier, "send_products_tg", send_products_tg)
+    return albums
+
+
+def make_queue(path, **kwargs) -> NotificationQueue:
+    return NotificationQueue(str(path), interval=0, linger=0.01, **kwargs)
+
+
+async def test_pending_deals_are_replayed_in_order(tmp_path, sent):
+    path = tmp_path / "queue.jsonl"
+    queue = make_queue(path)
+    for id in (1, 2, 3):
+        queue.put(make_product(id))
+
+    restored = make_queue(path, album_size=5)
+    restored.start()
+    await restored.close(timeout=5)
+
+    assert sent == [[1, 2, 3]]
+
+
+async def test_acknowledged_deals_are_not_replayed(tmp_path, sent):
+    path = tmp_path / "queue.jsonl"
+    queue = make_queue(path, album_size=2)
+    queue.start()
+    for id in (1, 2, 3):
+        queue.put(make_product(id))
+    await queue.close(timeout=5)
+
+    assert sent == [[1, 2], [3]]
+    assert path.read_text() == ""
+    assert make_queue(path)._queue.qsize() == 0
+
+
+async def test_journal_cut_short_keeps_complete_entries(tmp_path, sent):
+    path = tmp_path / "queue.jsonl"
+    make_queue(path).put(make_product(1))
+    with path.open("a") as file:
+        file.write('{"seq": 2, "product": {"id"')
+
+    restored = make_queue(path)
+    restored.start()
+    await restored.close(timeout=5)
+
+    assert sent == [[1]]
+
+
+async def test_album_in_flight_at_close_is_kept(tmp_path, monkeypatch):
+    sending = asyncio.Event()
+
+    async def send_products_tg(products):
+        sending.set()
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(src.notifier, "send_products_tg", send_products_tg)
+    path = tmp_path / "queue.jsonl"
+    queue = make_queue(path, album_size=5)
+    queue.start()
+    queue.put(make_product(1))
+    queue.put(make_product(2))
+    await sending.wait()
+
+    await queue.close(timeout=0.01)
+
+    restored = make_queue(path)
+    assert [restored._queue.get_nowait()[1].id for _ in range(2)] == [1, 2]
+
+
+async def test_journal_is_truncated_once_everything_is_sent(tmp_path, sent):
+    path = tmp_path / "queue.jsonl"
+    queue = make_queue(path)
+    queue.start()
+    queue.put(make_product(1))
+    while not sent:
+        await asyncio.sleep(0.01)
+
+    # Still running, as in crawl_forever.
+    assert path.read_text() == ""
+    await queue.close(timeout=5)
+
+
+async def test_large_journal_is_compacted_to_pending_deals(tmp_path, monkeypatch):
+    sent = []
+    blocked = asyncio.Event()
+
+    async def send_products_tg(products):
+        if products[0].id == 3:
+            blocked.set()
+            await asyncio.sleep(60)
+        sent.append(products[0].id)
+
+    monkeypatch.setattr(src.notifier, "send_products_tg", send_products_tg)
+    monkeypatch.setattr(src.notifier, "JOURNAL_COMPACT_BYTES", 0)
+    path = tmp_path / "queue.jsonl"
+    queue = make_queue(path, album_size=1)
+    for id in (1, 2, 3):
+        queue.put(make_product(id))
+    queue.start()
+    await blocked.wait()
+
+    lines = path.read_text().splitlines()
+    await queue.close(timeout=0.01)
+
+    assert sent == [1, 2]
+    assert [json.loads(line)["seq"] for line in lines] == [3]
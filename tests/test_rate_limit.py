@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from src.spider import HostRateLimiter
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    """
+    Stands in for the event loop's clock; sleeping advances it instantly.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+@pytest.fixture
+async def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(asyncio.get_running_loop(), "time", clock.time)
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    return clock
+
+
+async def test_requests_are_spaced_by_the_rate(clock):
+    limiter = HostRateLimiter(rate=4)
+
+    for _ in range(3):
+        await limiter.acquire()
+
+    assert clock.sleeps == [0.25, 0.25]
+
+
+async def test_idle_time_is_not_banked(clock):
+    limiter = HostRateLimiter(rate=4)
+    await limiter.acquire()
+    clock.now += 10
+
+    await limiter.acquire()
+    await limiter.acquire()
+
+    assert clock.sleeps == [0.25]
+
+
+async def test_backoff_waits_out_retry_after_then_widens_the_interval(clock):
+    limiter = HostRateLimiter(rate=4)
+    await limiter.acquire()
+
+    limiter.backoff(retry_after=30)
+    await limiter.acquire()
+    await limiter.acquire()
+
+    assert clock.sleeps == [30, 0.5]
+
+
+async def test_backoff_is_capped_and_recovers_to_the_rate():
+    limiter = HostRateLimiter(rate=4, max_interval=1)
+    for _ in range(5):
+        limiter.backoff()
+    assert limiter.interval == 1
+
+    for _ in range(50):
+        limiter.recover()
+    assert limiter.interval == 0.25
@@ -0,0 +1,191 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import src.utils.ttl_cache
+from src.services.cache import GENERATION_KEY, bump_generation, cached_response
+from src.utils.ttl_cache import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(src.utils.ttl_cache, "time", clock)
+    return clock
+
+
+async def test_concurrent_misses_share_one_load():
+    cache: TTLCache[str] = TTLCache(maxsize=10, ttl=60)
+    release = asyncio.Event()
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        await release.wait()
+        return "value"
+
+    waiters = [asyncio.create_task(cache.get_or_load("key", load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["value"] * 5
+    assert loads == 1
+    assert cache.stats() == {
+        "size": 1,
+        "maxsize": 10,
+        "hits": 0,
+        "misses": 1,
+        "coalesced": 4,
+    }
+    assert await cache.get_or_load("key", load) == "value"
+    assert cache.hits == 1
+
+
+async def test_load_error_reaches_every_waiter_and_is_not_cached():
+    cache: TTLCache[str] = TTLCache(maxsize=10, ttl=60)
+    release = asyncio.Event()
+
+    async def fail():
+        await release.wait()
+        raise RuntimeError("backend down")
+
+    waiters = [asyncio.create_task(cache.get_or_load("key", fail)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def load():
+        return "value"
+
+    assert await cache.get_or_load("key", load) == "value"
+
+
+async def test_cancelled_load_does_not_wedge_the_key():
+    cache: TTLCache[str] = TTLCache(maxsize=10, ttl=60)
+
+    async def hang():
+        await asyncio.sleep(60)
+
+    loader = asyncio.create_task(cache.get_or_load("key", hang))
+    await asyncio.sleep(0)
+    loader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await loader
+
+    async def load():
+        return "value"
+
+    assert await cache.get_or_load("key", load) == "value"
+
+
+def test_entries_expire_after_ttl(clock):
+    cache: TTLCache[str] = TTLCache(maxsize=10, ttl=30)
+    cache.set("key", "value")
+
+    clock.now += 29
+    assert cache.get("key") == "value"
+    clock.now += 1
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache: TTLCache[int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.reads = []
+
+    async def get(self, key):
+        self.reads.append(key)
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key) or 0) + 1
+        return self.data[key]
+
+
+async def test_local_cache_is_checked_before_redis_and_scoped_by_generation():
+    redis = FakeRedis()
+    app = SimpleNamespace(state=SimpleNamespace(redis=redis))
+    request = SimpleNamespace(app=app, headers={})
+    local: TTLCache[bytes] = TTLCache(maxsize=10, ttl=60)
+    builds = 0
+
+    async def build():
+        nonlocal builds
+        builds += 1
+        return f'{{"build": {builds}}}'.encode()
+
+    async def get():
+        response = await cached_response(request, "products:detail", {}, build, local)
+        return response.body
+
+    assert await get() == b'{"build": 1}'
+    redis.reads.clear()
+    assert await get() == b'{"build": 1}'
+    # Only the generation was read from Redis, not the cached body.
+    assert redis.reads == [GENERATION_KEY]
+
+    await bump_generation(redis)
+    assert await get() == b'{"build": 2}'
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    # As sent back, compared strongly, and among other tags.
+    ["W/{tag}", "{tag}", '"other", W/{tag}'],
+)
+async def test_matching_etag_gets_not_modified_until_the_generation_changes(
+    if_none_match,
+):
+    redis = FakeRedis()
+    app = SimpleNamespace(state=SimpleNamespace(redis=redis))
+
+    async def build():
+        return b"{}"
+
+    async def get(headers):
+        request = SimpleNamespace(app=app, headers=headers)
+        return await cached_response(request, "products:detail", {}, build)
+
+    etag = (await get({})).headers["ETag"]
+    assert etag.startswith('W/"')
+    revalidation = {"If-None-Match": if_none_match.format(tag=etag[2:])}
+
+    redis.reads.clear()
+    response = await get(revalidation)
+    assert (response.status_code, response.headers["ETag"]) == (304, etag)
+    assert response.body == b""
+    assert redis.reads == [GENERATION_KEY]
+
+    await bump_generation(redis)
+    response = await get(revalidation)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,207 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select, text, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.services.product
+import src.spider
+from src.database import engine
+from src.models.price_history import PriceHistoryOrm
+from src.models.product import ProductOrm
+from src.services.product import (
+    expire_unseen_products,
+    purge_expired_products,
+    upsert_products,
+)
+from tests.factories import make_product
+
+pytestmark = pytest.mark.anyio
+
+# Far above the ids ASOS hands out, and rolled back after each test anyway.
+FIRST_ID = 2_100_000_001
+
+
+@pytest.fixture
+async def session():
+    """
+    A session joined to the connection's transaction, which is rolled back
+    after the test.
+    """
+    try:
+        connection = await engine.connect()
+    except (OSError, SQLAlchemyError) as ex:
+        await engine.dispose()
+        pytest.skip(f"Postgres is not available: {ex!r}")
+    try:
+        if await connection.scalar(text("SELECT to_regclass('price_history')")) is None:
+            pytest.skip("The test database is not migrated, run alembic upgrade head")
+        async with AsyncSession(bind=connection) as session:
+            yield session
+        await connection.rollback()
+    finally:
+        await connection.close()
+        # Pooled connections are bound to this test's event loop.
+        await engine.dispose()
+
+
+class JoinedUnitOfWork:
+    """
+    Stands in for ``UnitOfWork`` so the cleanup jobs run inside the test's
+    transaction: their commits only flush, and the fixture rolls them back.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    async def session(self) -> AsyncSession:
+        return self._session
+
+    async def commit(self) -> None:
+        await self._session.flush()
+
+    async def rollback(self) -> None:
+        pass
+
+    async def __aenter__(self) -> "JoinedUnitOfWork":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+
+@pytest.fixture
+def joined(session, monkeypatch):
+    monkeypatch.setattr(
+        src.services.product, "UnitOfWork", lambda: JoinedUnitOfWork(session)
+    )
+    return session
+
+
+async def expired_at(session, id: int):
+    return await session.scalar(select(ProductOrm.expired_at).where(ProductOrm.id == id))
+
+
+async def history_count(session, id: int) -> int:
+    stmt = select(func.count()).where(PriceHistoryOrm.product_id == id)
+    return await session.scalar(stmt)
+
+
+async def test_new_products_are_reported_as_inserted(session):
+    page = [make_product(FIRST_ID), make_product(FIRST_ID + 1)]
+
+    result = await upsert_products(page, session=session)
+
+    assert [product.id for product in result.inserted] == [FIRST_ID, FIRST_ID + 1]
+    assert result.price_changed == []
+    assert await history_count(session, FIRST_ID) == 1
+
+
+async def test_unchanged_products_are_not_rewritten(session):
+    page = [make_product(FIRST_ID)]
+    await upsert_products(page, session=session)
+
+    result = await upsert_products(page, session=session)
+
+    assert result.changed == []
+    assert await history_count(session, FIRST_ID) == 1
+
+
+async def test_price_change_is_reported_and_recorded(session):
+    await upsert_products([make_product(FIRST_ID)], session=session)
+    # now() is fixed for the transaction; date the first crawl back instead.
+    await session.execute(
+        update(PriceHistoryOrm)
+        .where(PriceHistoryOrm.product_id == FIRST_ID)
+        .values(observed_at=PriceHistoryOrm.observed_at - timedelta(hours=1))
+    )
+
+    result = await upsert_products([make_product(FIRST_ID, price=20.0)], session=session)
+
+    assert result.inserted == []
+    assert [product.id for product in result.price_changed] == [FIRST_ID]
+    assert await history_count(session, FIRST_ID) == 2
+
+
+async def test_change_without_new_price_is_written_but_not_reported(session):
+    await upsert_products([make_product(FIRST_ID)], session=session)
+
+    result = await upsert_products(
+        [make_product(FIRST_ID, selling_fast=True)], session=session
+    )
+
+    assert result.changed == []
+    assert await session.scalar(
+        select(ProductOrm.selling_fast).where(ProductOrm.id == FIRST_ID)
+    )
+    assert await history_count(session, FIRST_ID) == 1
+
+
+async def test_expired_product_is_revived_when_seen_again(session):
+    page = [make_product(FIRST_ID)]
+    await upsert_products(page, session=session)
+    await session.execute(
+        update(ProductOrm)
+        .where(ProductOrm.id == FIRST_ID)
+        .values(expired_at=func.now())
+    )
+
+    await upsert_products(page, session=session)
+
+    assert (
+        await session.scalar(
+            select(ProductOrm.expired_at).where(ProductOrm.id == FIRST_ID)
+        )
+        is None
+    )
+
+
+async def test_duplicate_ids_in_a_page_are_written_once(session):
+    page = [make_product(FIRST_ID), make_product(FIRST_ID, price=25.0)]
+
+    result = await upsert_products(page, session=session)
+
+    assert len(result.inserted) == 1
+    assert float(result.inserted[0].current_price) == 25.0
+
+
+async def test_unseen_products_are_expired_and_seen_ones_kept(joined):
+    ids = [FIRST_ID, FIRST_ID + 1, FIRST_ID + 2]
+    await upsert_products([make_product(id) for id in ids], session=joined)
+
+    expired = await expire_unseen_products([FIRST_ID], chunk_size=1)
+
+    # Any other live rows in the database are expired too, and rolled back.
+    assert expired >= 2
+    assert await expired_at(joined, FIRST_ID) is None
+    assert await expired_at(joined, FIRST_ID + 1) is not None
+    assert await expired_at(joined, FIRST_ID + 2) is not None
+
+
+async def test_only_products_expired_past_retention_are_purged(joined):
+    ids = [FIRST_ID, FIRST_ID + 1, FIRST_ID + 2]
+    await upsert_products([make_product(id) for id in ids], session=joined)
+    for id, age in ((FIRST_ID, timedelta(days=8)), (FIRST_ID + 1, timedelta(days=6))):
+        await joined.execute(
+            update(ProductOrm)
+            .where(ProductOrm.id == id)
+            .values(expired_at=func.now() - age)
+        )
+
+    await purge_expired_products(retention=timedelta(days=7), chunk_size=1)
+
+    remaining = await joined.scalars(
+        select(ProductOrm.id).where(ProductOrm.id.in_(ids)).order_by(ProductOrm.id)
+    )
+    assert list(remaining) == [FIRST_ID + 1, FIRST_ID + 2]
+
+
+async def test_crawl_that_saw_nothing_expires_nothing(monkeypatch):
+    async def fail(*args, **kwargs):
+        raise AssertionError("cleanup must not run")
+
+    monkeypatch.setattr(src.spider, "expire_unseen_products", fail)
+    monkeypatch.setattr(src.spider, "purge_expired_products", fail)
+
+    await src.spider.expire_stale_products(set())